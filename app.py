@@ -1,8 +1,20 @@
 import streamlit as st
-import pandas as pd
 from new_title_comparison import compare_titles
 from comparison_utils import process_files
-import io
+from ingestion import UPLOAD_TYPES, load_job_export
+from result_cache import ResultCache, export_key, result_key
+from rule_suggestions import unmapped_machinery_report
+from fuzzy_titles import DEFAULT_SIMILARITY
+from instrumentation import profiling
+from table_view import (
+    PAGE_SIZES,
+    count_cell_styles,
+    machinery_mask,
+    page_bounds,
+    page_count,
+    title_cell_styles,
+)
+from title_diff import COUNT_COLUMNS
 
 # Set page config
 st.set_page_config(
@@ -29,19 +41,80 @@ This tool compares machinery jobs between two CSV files:
 - Improved visual organization with expandable sections
 """)
 
+
+
+@st.cache_resource
+def get_result_cache():
+    # One cache per server process, shared by every session
+    return ResultCache()
+
+
+@st.cache_resource
+def get_export_cache():
+    # Parsed uploads with their memoized aggregates, cached per file so that
+    # re-uploading only the Job Status file leaves the Job List untouched
+    return ResultCache(max_entries=16)
+
+
+def load_cached_export(content, file_name):
+    # Streamlit already depends on pyarrow, so use its faster CSV reader
+    return get_export_cache().get_or_compute(
+        export_key(content, file_name),
+        lambda: load_job_export(content, file_name, engine="pyarrow"),
+    )
+
+
+def run_comparisons(file1_content, file2_content, file1_name, file2_name):
+    # Timings only; tracing memory would slow every upload down
+    with profiling(trace_memory=False) as profile:
+        # Parse and normalize each upload once; both comparisons share the result
+        export1 = load_cached_export(file1_content, file1_name)
+        export2 = load_cached_export(file2_content, file2_name)
+
+        # Compressed uploads are named after the CSV inside them
+        title_comparison, machinery_diff_list, title_excel_data = compare_titles(
+            export1, export2, export1.file_name, export2.file_name
+        )
+        count_comparison_df, count_excel_data = process_files(
+            export1, export2, export1.file_name, export2.file_name
+        )
+    return title_comparison, machinery_diff_list, title_excel_data, count_comparison_df, count_excel_data, profile
+
+
+def table_controls(key):
+    # Filter box and page size for a large table; the page picker goes in the returned column
+    filter_col, size_col, page_col = st.columns([3, 1, 1])
+    query = filter_col.text_input("Filter machinery", key=f"{key}_filter")
+    page_size = size_col.selectbox("Rows per page", PAGE_SIZES, key=f"{key}_page_size")
+    return query, page_size, page_col
+
+
+def page_controls(rows, page_size, page_col, key):
+    pages = page_count(rows, page_size)
+    # The page count is part of the key, so narrowing the filter starts again at page 1
+    page = page_col.number_input(
+        f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"{key}_page_{pages}"
+    )
+    start, stop = page_bounds(page, page_size, rows)
+    st.caption(f"Showing rows {start + 1 if rows else 0}–{stop} of {rows}")
+    return start, stop
+
+
 col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("Job List File")
-    file1 = st.file_uploader("Upload Job List( System Management) CSV file", type=["csv"])
+    file1 = st.file_uploader("Upload Job List( System Management) CSV file", type=UPLOAD_TYPES,
+                             help="A plain CSV, or a .zip, .gz or .xz containing one")
 
 with col2:
     st.subheader("Second File")
-    file2 = st.file_uploader("Upload Job Status CSV file", type=["csv"])
+    file2 = st.file_uploader("Upload Job Status CSV file", type=UPLOAD_TYPES,
+                             help="A plain CSV, or a .zip, .gz or .xz containing one")
 
 # Session state initialization
-if 'title_diff_df' not in st.session_state:
-    st.session_state.title_diff_df = None
+if 'title_comparison' not in st.session_state:
+    st.session_state.title_comparison = None
 if 'machinery_diff_list' not in st.session_state:
     st.session_state.machinery_diff_list = None
 if 'title_excel_data' not in st.session_state:
@@ -50,31 +123,37 @@ if 'count_comparison_df' not in st.session_state:
     st.session_state.count_comparison_df = None
 if 'count_excel_data' not in st.session_state:
     st.session_state.count_excel_data = None
+if 'performance_profile' not in st.session_state:
+    st.session_state.performance_profile = None
 
+# Cache key of the current uploads, also used for the reports computed from them
+upload_key = None
 if file1 and file2:
     try:
         file1_content = file1.getvalue()
         file2_content = file2.getvalue()
+        upload_key = result_key(file1_content, file2_content, file1.name, file2.name)
 
         with st.spinner("Processing files for both comparisons..."):
-            title_diff_df, machinery_diff_list, title_excel_data = compare_titles(
-                file1_content, file2_content, file1.name, file2.name
-            )
-            # Rename columns globally before saving to session and Excel
-            title_diff_df = title_diff_df.rename(columns={
-                title_diff_df.columns[3]: 'Titles only in Job List File',
-                title_diff_df.columns[4]: 'Titles only in Job Status File'
-            })
-
-            count_comparison_df, count_excel_data = process_files(
-                file1_content, file2_content, file1.name, file2.name
+            # Reruns (tab switches, downloads) with the same uploads reuse the cached result.
+            # The Excel reports inside it are built on the first download and kept there.
+            (
+                title_comparison,
+                machinery_diff_list,
+                title_excel_data,
+                count_comparison_df,
+                count_excel_data,
+                performance_profile,
+            ) = get_result_cache().get_or_compute(
+                upload_key, lambda: run_comparisons(file1_content, file2_content, file1.name, file2.name)
             )
 
-            st.session_state.title_diff_df = title_diff_df
+            st.session_state.title_comparison = title_comparison
             st.session_state.machinery_diff_list = machinery_diff_list
             st.session_state.title_excel_data = title_excel_data
             st.session_state.count_comparison_df = count_comparison_df
             st.session_state.count_excel_data = count_excel_data
+            st.session_state.performance_profile = performance_profile
 
             st.success("Files processed successfully! View results in the tabs below.")
     except Exception as e:
@@ -86,13 +165,13 @@ tab1, tab2 = st.tabs(["Job Title Comparison", "Machinery Count Comparison"])
 
 with tab1:
     st.header("Job Title Comparison Results")
-    if st.session_state.title_diff_df is not None and st.session_state.machinery_diff_list is not None:
-        title_diff_df = st.session_state.title_diff_df
+    if st.session_state.title_comparison is not None and st.session_state.machinery_diff_list is not None:
+        title_comparison = st.session_state.title_comparison
         machinery_diff_list = st.session_state.machinery_diff_list
         title_excel_data = st.session_state.title_excel_data
 
         st.subheader("📊 Comparison Summary")
-        total_machinery = len(title_diff_df)
+        total_machinery = len(title_comparison)
         diff_count = len(machinery_diff_list)
         same_count = total_machinery - diff_count
 
@@ -107,37 +186,41 @@ with tab1:
             st.text_area("Machinery List:", "\n".join([f"• {m}" for m in machinery_diff_list]), height=150)
 
             st.subheader("🔄 Detailed Title Comparison")
-            diff_only_df = title_diff_df[title_diff_df['Has Differences'] == 'Yes'].copy()
-            # Rename columns for user-friendly labeling
-            diff_only_df = diff_only_df.rename(columns={
-                diff_only_df.columns[3]: 'Titles only in Job List File',
-                diff_only_df.columns[4]: 'Titles only in Job Status File'
-            })
+            diff_only = title_comparison.differences()
+            query, page_size, page_col = table_controls("title_table")
+            diff_only = diff_only.where(machinery_mask(diff_only.frame['Machinery'], query))
+            start, stop = page_controls(len(diff_only), page_size, page_col, "title_table")
+
+            # Only the visible page is rendered and styled
+            diff_only = diff_only.rows(start, stop)
+            # Render display strings with user-friendly labeling
+            diff_only_df = diff_only.to_display_frame(
+                'Titles only in Job List File', 'Titles only in Job Status File'
+            )
 
             title_cols = diff_only_df.columns[2:5]  # Common Titles, Titles only in File 1, Titles only in File 2
-            for col in title_cols:
-                def format_with_count(row):
-                    if row[col] == '-' or pd.isna(row[col]):
-                        return row[col]
-                    count = len([x for x in row[col].split(', ') if x.strip()])
-                    return f"{row[col]}\n(count: {count})" if count > 0 else row[col]
-                diff_only_df[col] = diff_only_df.apply(format_with_count, axis=1)
-
-            def highlight_title_counts(row):
-                styles = [''] * len(row)
-                for idx, col in enumerate(row.index):
-                    if 'Titles only in' in col and row[col] != '-':
-                        styles[idx] = 'background-color: #FFF3E0'  # orange
-                    elif 'Common Titles' in col and row[col] != '-':
-                        styles[idx] = 'background-color: #E8F5E9'  # green
-                    elif 'Count' in col and row[col] > 0:
-                        styles[idx] = 'background-color: #E3E1F7'  # purple tint
-                return styles
-
-            styled_df = diff_only_df.style.apply(highlight_title_counts, axis=1)
+            for col, count_col in zip(title_cols, COUNT_COLUMNS):
+                counts = diff_only.frame[count_col]
+                diff_only_df[col] = diff_only_df[col].where(
+                    counts == 0, diff_only_df[col] + "\n(count: " + counts.astype(str) + ")"
+                )
+
+            styled_df = diff_only_df.style.apply(title_cell_styles, axis=None)
             st.dataframe(styled_df, use_container_width=True)
 
-            if isinstance(title_excel_data, bytes):
+            if st.checkbox("Show probable matches between one-sided titles", key="fuzzy_titles"):
+                threshold = st.slider("Similarity threshold", 0.5, 1.0, DEFAULT_SIMILARITY, 0.05)
+                probable_matches = title_comparison.probable_matches(threshold)
+                relabel = {
+                    title_comparison.first_column: 'Title only in Job List File',
+                    title_comparison.second_column: 'Title only in Job Status File',
+                }
+                st.write(
+                    f"**{len(probable_matches)}** one-sided title pairs look like the same job written differently:"
+                )
+                st.dataframe(probable_matches.rename(columns=relabel), use_container_width=True, hide_index=True)
+
+            if title_excel_data is not None:
                 st.subheader("📅 Download Report")
                 st.download_button(
                     label="Download Job Title Comparison Report",
@@ -156,26 +239,13 @@ with tab2:
         comparison_df = st.session_state.count_comparison_df
         excel_data = st.session_state.count_excel_data
 
-        def highlight_differences(row):
-            styles = [''] * len(row)
-            if row['Machinery'] != 'TOTAL':
-                col1_name = comparison_df.columns[1]
-                col2_name = comparison_df.columns[2]
-                if row[col1_name] == 0 or row[col2_name] == 0:
-                    styles[0] = 'background-color: #FFC7CE; font-weight: bold'
-                    styles[3] = 'background-color: #FFC7CE; color: #9C0006'
-                if row[col1_name] != row[col2_name]:
-                    styles[1] = 'background-color: #FFEB9C'
-                    styles[2] = 'background-color: #FFEB9C'
-                    if row[col1_name] > row[col2_name]:
-                        styles[3] = 'background-color: #C6EFCE; color: #006100'
-                    else:
-                        styles[3] = 'background-color: #FFC7CE; color: #9C0006'
-            else:
-                return ['font-weight: bold'] * len(row)
-            return styles
-
-        styled_df = comparison_df.style.apply(highlight_differences, axis=1)
+        query, page_size, page_col = table_controls("count_table")
+        filtered_df = comparison_df[machinery_mask(comparison_df['Machinery'], query)]
+        start, stop = page_controls(len(filtered_df), page_size, page_col, "count_table")
+
+        # Only the visible page is styled, with one vectorized mask per column
+        page_df = filtered_df.iloc[start:stop]
+        styled_df = page_df.style.apply(count_cell_styles, axis=None)
         st.dataframe(styled_df, use_container_width=True)
 
         st.download_button(
@@ -185,6 +255,25 @@ with tab2:
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
 
+        if (
+            upload_key is not None
+            and st.checkbox("Find machinery names no renaming rule covers", key="unmapped_machinery")
+        ):
+            # Needs the raw names, so it scans the uploads; cached next to the comparison
+            # so that paging and filtering with the box ticked don't scan them again
+            unmapped = get_result_cache().get_or_compute(
+                (upload_key, 'unmapped machinery'),
+                lambda: unmapped_machinery_report(
+                    [(file1.name, file1.getvalue()), (file2.name, file2.getvalue())]
+                ),
+            )
+            st.write(
+                f"**{len(unmapped)}** machinery names passed through unchanged. "
+                "Suggestions are the closest existing rule outputs; the Rule column is a "
+                "ready-made machinery_rules.csv row."
+            )
+            st.dataframe(unmapped, use_container_width=True, hide_index=True)
+
         st.info("""
         **Explanation:**
         - **Red highlighting**: Machinery that only exists in one file
@@ -196,3 +285,13 @@ with tab2:
         """)
     else:
         st.info("Please upload both CSV files to generate the machinery count comparison report.")
+
+if st.session_state.performance_profile is not None and st.session_state.performance_profile.spans:
+    with st.expander("⏱️ Performance"):
+        performance_profile = st.session_state.performance_profile
+        st.write(f"Processing took **{performance_profile.total_seconds * 1000:,.0f} ms** for the last new upload.")
+        st.dataframe(performance_profile.summary_frame(), use_container_width=True, hide_index=True)
+        st.caption(
+            "Excel reports are built when downloaded and are not included. "
+            "Peak memory is recorded by the command line tool (--profile-json)."
+        )
@@ -0,0 +1,192 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from comparison_utils import process_files
+from ingestion import JobExport, machinery_columns, read_job_export_frame
+from machinery_normalizer import MACHINERY_RULES, RULES_VERSION, normalize_machinery_series
+from new_title_comparison import compare_titles
+
+DEFAULT_SCALES = (1_000, 10_000, 100_000)
+STAGES = ('parse', 'normalize', 'diff', 'counts', 'title_excel', 'count_excel')
+REGRESSION_THRESHOLD = 0.10
+
+BASE_MACHINERY = [
+    'Main Engine', 'Auxiliary Engine No.1', 'Auxiliary Engine No.2', 'Fire Pump', 'Emergency Fire Pump',
+    'Boiler Feed Pump', 'Ballast Pump', 'Bilge Pump', 'Mooring Winch', 'Anchor Windlass', 'Steering Gear',
+    'Purifier No.1', 'Purifier No.2', 'Air Compressor', 'Fresh Water Generator', 'Sewage Treatment Plant',
+    'Incinerator', 'Hatch Cover', 'Provision Crane', 'Lifeboat Davit', 'Rescue Boat', 'Liferaft',
+    'Accommodation Ladder', 'Pilot Ladder', 'Search Light',
+]
+# Side and end variants the suffix rules fold together
+SUFFIXES = ['', 'Port', 'Starboard', 'Fwd', 'Forward', 'Aft', '-P', '-S', '-Port', '-Stbd', ' 1', ' 2']
+TITLES = [
+    'Inspect', 'Overhaul', 'Lube', 'Calibrate', 'Clean filter', 'Survey', 'Replace', 'Test',
+    'Check, test alarms', 'Renew gaskets', 'Megger test motor', 'Sample oil', 'Check clearances',
+    'Grease bearings', 'Load test', 'Pressure test', 'Overhaul of bowl', 'Visual inspection',
+]
+INTERVALS = ['30 Days', '90 Days', '180 Days', '1 Year', '2.5 Years', '5 Years', '8000 Hours']
+
+
+def synthetic_machinery_names(count, seed=0):
+    """Raw machinery names as they appear in exports, with the variants the rules handle.
+
+    Mixes generic names with side suffixes and the literal spellings of the
+    specific rules, so every normalization path gets exercised.
+    """
+    rng = random.Random(seed)
+    specific = [
+        pattern.strip('^$').replace('-?', '-').replace('\\', '')
+        for pattern in MACHINERY_RULES['specific']
+    ]
+    names = []
+    while len(names) < count:
+        if rng.random() < 0.3:
+            names.append(rng.choice(specific))
+        else:
+            names.append(rng.choice(BASE_MACHINERY) + rng.choice(SUFFIXES))
+    return names
+
+
+def generate_export(rows, job_list=True, machinery_count=None, vessel='Synthetic Vessel', seed=0):
+    """CSV bytes shaped like a Job List (``Machinery``/``Job Title``) or Job Status
+    (``Machinery Location``/``Title``) export.
+
+    The same ``seed`` with ``job_list`` flipped gives a second file that
+    mostly agrees with the first, with some jobs dropped and some added.
+    """
+    machinery_count = machinery_count or max(10, rows // 40)
+    machinery = synthetic_machinery_names(machinery_count, seed)
+    # Shared structure between both sides; the side only changes the noise
+    base_rng = random.Random(seed)
+    noise_rng = random.Random(seed * 2 + (0 if job_list else 1))
+
+    records = []
+    for row in range(rows):
+        name = machinery[base_rng.randrange(machinery_count)]
+        title = base_rng.choice(TITLES)
+        interval = base_rng.choice(INTERVALS)
+        roll = noise_rng.random()
+        if roll < 0.05:
+            continue  # job missing from this side
+        if roll < 0.10:
+            title = noise_rng.choice(TITLES) + ' (extra)'
+        if roll < 0.12:
+            name = ''
+        records.append((vessel, f'J{row:06d}', name, title, interval))
+
+    machinery_column, title_column = ('Machinery', 'Job Title') if job_list else ('Machinery Location', 'Title')
+    frame = pd.DataFrame(records, columns=['Vessel', 'Job Code', machinery_column, title_column, 'Interval'])
+    return frame.to_csv(index=False).encode('utf-8')
+
+
+def _timed(timings, stage, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+    return result
+
+
+def _normalize(frame, file_name):
+    for column in machinery_columns(frame.columns):
+        frame[column] = normalize_machinery_series(frame[column])
+    return JobExport(frame, file_name)
+
+
+def time_pipeline(file1_content, file2_content, file1_name, file2_name):
+    """Seconds spent in each pipeline stage for one comparison of two exports."""
+    timings = {}
+    frame1 = _timed(timings, 'parse', read_job_export_frame, file1_content)
+    frame2 = _timed(timings, 'parse', read_job_export_frame, file2_content)
+    export1 = _timed(timings, 'normalize', _normalize, frame1, file1_name)
+    export2 = _timed(timings, 'normalize', _normalize, frame2, file2_name)
+    _, _, title_report = _timed(timings, 'diff', compare_titles, export1, export2, file1_name, file2_name)
+    _, count_report = _timed(timings, 'counts', process_files, export1, export2, file1_name, file2_name)
+    _timed(timings, 'title_excel', title_report)
+    _timed(timings, 'count_excel', count_report)
+    return timings
+
+
+def run_benchmark(scales=DEFAULT_SCALES, repeat=3, seed=0):
+    """Best-of-``repeat`` stage timings per row count, with the environment they ran in."""
+    results = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'rules_version': RULES_VERSION,
+        'repeat': repeat,
+        'scales': {},
+    }
+    for rows in scales:
+        file1 = generate_export(rows, job_list=True, seed=seed)
+        file2 = generate_export(rows, job_list=False, seed=seed)
+        best = {}
+        for _ in range(repeat):
+            timings = time_pipeline(file1, file2, 'Synthetic Vessel Job List 01012025.csv', 'Synthetic Vessel 02012025.csv')
+            for stage, seconds in timings.items():
+                best[stage] = min(seconds, best.get(stage, seconds))
+        best['total'] = sum(best[stage] for stage in STAGES)
+        results['scales'][str(rows)] = best
+    return results
+
+
+def compare_results(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """Stages that got slower than ``baseline`` by more than ``threshold`` (a fraction).
+
+    Returns ``[(rows, stage, baseline_seconds, current_seconds)]`` for the
+    scales both runs share.
+    """
+    regressions = []
+    for rows, stages in current['scales'].items():
+        previous = baseline['scales'].get(rows)
+        if previous is None:
+            continue
+        for stage, seconds in stages.items():
+            before = previous.get(stage)
+            if before and seconds > before * (1 + threshold):
+                regressions.append((rows, stage, before, seconds))
+    return regressions
+
+
+def format_results(results):
+    columns = STAGES + ('total',)
+    lines = ['rows'.rjust(8) + ''.join(stage.rjust(13) for stage in columns)]
+    for rows, stages in results['scales'].items():
+        lines.append(rows.rjust(8) + ''.join(f"{stages[stage] * 1000:11.1f}ms" for stage in columns))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time each stage of the comparison pipeline on synthetic exports.')
+    parser.add_argument('--rows', type=int, nargs='+', default=list(DEFAULT_SCALES), help='rows per export')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per scale; the fastest is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to check for regressions')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='allowed slowdown before a stage counts as a regression (default: 0.10)')
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.rows, repeat=args.repeat, seed=args.seed)
+    print(format_results(results))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            regressions = compare_results(json.load(baseline_file), results, args.threshold)
+        for rows, stage, before, after in regressions:
+            print(f"REGRESSION {rows} rows {stage}: {before * 1000:.1f}ms -> {after * 1000:.1f}ms", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,115 @@
+import argparse
+import os
+
+from comparison_utils import process_files
+from ingestion import DEFAULT_CHUNK_ROWS, is_compressed, load_job_export, stream_job_export
+from instrumentation import profiling
+from new_title_comparison import compare_titles
+from parallel_ingest import parallel_job_export
+
+TITLE_REPORT_NAME = 'Job_Title_Comparison.xlsx'
+COUNT_REPORT_NAME = 'Machinery_Count_Comparison.xlsx'
+
+
+def _load_export(path, store=None, chunk_rows=None, workers=None):
+    file_name = os.path.basename(path)
+    if is_compressed(file_name):
+        # Decompressed while it is read; splitting across workers needs a plain CSV
+        return stream_job_export(path, file_name, chunksize=chunk_rows or DEFAULT_CHUNK_ROWS)
+    if workers:
+        return parallel_job_export(path, file_name, max_workers=workers, chunksize=chunk_rows or DEFAULT_CHUNK_ROWS)
+    if chunk_rows:
+        # Aggregated straight from the file; neither the bytes nor the rows are kept
+        return stream_job_export(path, file_name, chunksize=chunk_rows)
+    with open(path, 'rb') as csv_file:
+        content = csv_file.read()
+    if store is not None:
+        return store.ingest(content, file_name)
+    return load_job_export(content, file_name, engine='pyarrow')
+
+
+def run_comparisons(job_list_path, job_status_path, output_dir='.', store=None, chunk_rows=None, workers=None):
+    """Compare two exports on disk and write both Excel reports to ``output_dir``.
+
+    With a ``SnapshotStore`` the exports are read from (or added to) the
+    store instead of being parsed again. With ``chunk_rows`` they are
+    streamed in chunks of that many rows instead (see
+    ``ingestion.stream_job_export``), and with ``workers`` each file is
+    split across that many processes (see ``parallel_ingest``). Returns a
+    small summary dict of the results and the report paths.
+    """
+    export1 = _load_export(job_list_path, store, chunk_rows, workers)
+    export2 = _load_export(job_status_path, store, chunk_rows, workers)
+    # Compressed exports are named after the CSV inside them
+    file1_name, file2_name = export1.file_name, export2.file_name
+
+    title_comparison, machinery_diff_list, title_report = compare_titles(export1, export2, file1_name, file2_name)
+    count_comparison_df, count_report = process_files(export1, export2, file1_name, file2_name)
+
+    os.makedirs(output_dir, exist_ok=True)
+    reports = {}
+    for name, report in ((TITLE_REPORT_NAME, title_report), (COUNT_REPORT_NAME, count_report)):
+        if report is None:
+            continue
+        path = os.path.join(output_dir, name)
+        with open(path, 'wb') as report_file:
+            report_file.write(report())
+        reports[name] = path
+
+    return {
+        'machinery_items': len(title_comparison),
+        'items_with_different_titles': len(machinery_diff_list),
+        'count_rows': len(count_comparison_df) - 1,  # without the TOTAL row
+        'reports': reports,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m comparison_cli',
+        description='Compare a Job List export with a Job Status export and write the Excel reports.',
+    )
+    parser.add_argument('job_list', help='Job List (System Management) CSV file, or a .zip, .gz or .xz of one')
+    parser.add_argument('job_status', help='Job Status CSV file, or a .zip, .gz or .xz of one')
+    parser.add_argument('-o', '--output-dir', default='.', help='directory for the reports (default: current)')
+    parser.add_argument('--store', help='Parquet snapshot store to read normalized exports from and add them to')
+    parser.add_argument('--stream', nargs='?', type=int, const=DEFAULT_CHUNK_ROWS, metavar='CHUNK_ROWS',
+                        help='read the exports in chunks to bound memory on very large files '
+                             f'(default chunk: {DEFAULT_CHUNK_ROWS:,} rows)')
+    parser.add_argument('--workers', type=int, metavar='N',
+                        help='parse each export with N processes, splitting it at row boundaries')
+    parser.add_argument('--profile-json', metavar='PATH',
+                        help="write per-stage timings, row counts and peak memory as JSON ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    if args.store and (args.stream or args.workers):
+        parser.error('--store cannot be combined with --stream or --workers')
+    if args.store and (is_compressed(args.job_list) or is_compressed(args.job_status)):
+        parser.error('--store needs uncompressed CSV files')
+
+    store = None
+    if args.store:
+        # pyarrow is only needed when the store is used
+        from snapshot_store import SnapshotStore
+        store = SnapshotStore(args.store)
+
+    with profiling(trace_memory=bool(args.profile_json)) as profile:
+        summary = run_comparisons(
+            args.job_list, args.job_status, args.output_dir, store=store, chunk_rows=args.stream,
+            workers=args.workers,
+        )
+    print(f"Machinery items: {summary['machinery_items']}")
+    print(f"Items with different titles: {summary['items_with_different_titles']}")
+    for path in summary['reports'].values():
+        print(f"Wrote {path}")
+
+    if args.profile_json == '-':
+        print(profile.to_json(indent=2))
+    elif args.profile_json:
+        with open(args.profile_json, 'w', encoding='utf-8') as profile_file:
+            profile_file.write(profile.to_json(indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
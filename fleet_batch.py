@@ -0,0 +1,327 @@
+import argparse
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, NamedStyle, PatternFill
+
+from comparison_utils import process_files
+from ingestion import load_job_export
+from new_title_comparison import compare_titles, extract_date_from_filename, get_vessel_name
+
+JOB_LIST_MARKERS = ('job list', 'system management')
+_SHEET_TITLE_INVALID_RE = re.compile(r'[\[\]:*?/\\]')
+_SHEET_TITLE_MAX = 31
+_VESSEL_CHUNK_ROWS = 1000
+
+
+def read_export_files(source):
+    """Return ``[(file_name, bytes)]`` for every CSV in a directory or zip archive."""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            return [
+                (os.path.basename(info.filename), archive.read(info))
+                for info in sorted(archive.infolist(), key=lambda info: info.filename)
+                if not info.is_dir()
+                and info.filename.lower().endswith('.csv')
+                and not info.filename.startswith('__MACOSX/')
+            ]
+
+    files = []
+    for file_name in sorted(os.listdir(source)):
+        path = os.path.join(source, file_name)
+        if os.path.isfile(path) and file_name.lower().endswith('.csv'):
+            with open(path, 'rb') as csv_file:
+                files.append((file_name, csv_file.read()))
+    return files
+
+
+def is_job_list(file_name):
+    """Job List (System Management) exports say so in the file name; the rest are Job Status exports."""
+    name = file_name.lower()
+    return any(marker in name for marker in JOB_LIST_MARKERS)
+
+
+def export_date(file_name):
+    """Snapshot date from a ``<name> DDMMYYYY.csv`` file name, or None."""
+    try:
+        return datetime.strptime(extract_date_from_filename(file_name), '%d-%m-%Y')
+    except ValueError:
+        return None
+
+
+def export_vessel(file_name, content):
+    """Vessel name from the Vessel column, falling back to the file name prefix.
+
+    Only the rows up to the first named vessel are parsed; an export holds
+    one vessel.
+    """
+    header = pd.read_csv(BytesIO(content), nrows=0).columns
+    if 'Vessel' in header:
+        for chunk in pd.read_csv(BytesIO(content), usecols=['Vessel'], dtype=str, chunksize=_VESSEL_CHUNK_ROWS):
+            vessel = get_vessel_name(chunk)
+            if vessel != 'Unknown Vessel':
+                return str(vessel).strip()
+
+    words = os.path.splitext(file_name)[0].split()[:-1]
+    name = ' '.join(words)
+    for marker in JOB_LIST_MARKERS:
+        name = re.sub(re.escape(marker), '', name, flags=re.IGNORECASE)
+    return ' '.join(name.split()) or 'Unknown Vessel'
+
+
+def pair_exports(files):
+    """Pair each vessel's Job List export with the Job Status export closest in date.
+
+    Returns ``(pairs, unpaired, unreadable)`` where ``pairs`` is a list of
+    ``(vessel, (list_name, list_bytes), (status_name, status_bytes))``
+    sorted by vessel and date, ``unpaired`` lists the file names that had
+    no counterpart and ``unreadable`` lists ``(file_name, error)`` for the
+    files that could not be parsed, so one bad export does not stop the batch.
+    """
+    job_lists = {}
+    job_statuses = {}
+    unreadable = []
+    for file_name, content in files:
+        try:
+            vessel = export_vessel(file_name, content)
+        except Exception as e:
+            unreadable.append((file_name, str(e) or type(e).__name__))
+            continue
+        target = job_lists if is_job_list(file_name) else job_statuses
+        target.setdefault(vessel, []).append((file_name, content))
+
+    pairs = []
+    unpaired = []
+    for vessel in sorted(set(job_lists) | set(job_statuses)):
+        statuses = list(job_statuses.get(vessel, []))
+        for job_list in sorted(job_lists.get(vessel, []), key=lambda f: export_date(f[0]) or datetime.min):
+            if not statuses:
+                unpaired.append(job_list[0])
+                continue
+            list_date = export_date(job_list[0])
+
+            def distance(status):
+                status_date = export_date(status[0])
+                if list_date is None or status_date is None:
+                    return float('inf')
+                return abs((status_date - list_date).days)
+
+            status = min(statuses, key=distance)
+            statuses.remove(status)
+            pairs.append((vessel, job_list, status))
+        unpaired.extend(file_name for file_name, _ in statuses)
+    return pairs, unpaired, unreadable
+
+
+def compare_pair(pair):
+    """Run both comparisons for one vessel; runs in a worker process.
+
+    Returns plain data only, so it pickles back to the parent. A failing
+    vessel is reported in ``error`` instead of aborting the whole batch.
+    """
+    vessel, (list_name, list_content), (status_name, status_content) = pair
+    result = {
+        'vessel': vessel,
+        'job_list_file': list_name,
+        'job_status_file': status_name,
+        'title_comparison': None,
+        'machinery_diff_list': [],
+        'count_comparison_df': None,
+        'error': None,
+    }
+    try:
+        export1 = load_job_export(list_content, list_name)
+        export2 = load_job_export(status_content, status_name)
+        title_comparison, machinery_diff_list, title_report = compare_titles(export1, export2, list_name, status_name)
+        if title_report is None:
+            # compare_titles logs its error and returns empty results instead of raising
+            raise ValueError('Job title comparison failed; the log has the details')
+        count_comparison_df, _ = process_files(export1, export2, list_name, status_name)
+        result.update(
+            title_comparison=title_comparison,
+            machinery_diff_list=machinery_diff_list,
+            count_comparison_df=count_comparison_df,
+        )
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def compare_fleet(pairs, max_workers=None):
+    """Compare every vessel pair across a process pool, one vessel per task."""
+    if max_workers == 1:
+        return [compare_pair(pair) for pair in pairs]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(compare_pair, pairs))
+
+
+def _fleet_styles():
+    return [
+        NamedStyle(name='fleet_bold', font=Font(bold=True)),
+        NamedStyle(
+            name='fleet_flag',
+            font=Font(color='9C0006'),
+            fill=PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid'),
+        ),
+    ]
+
+
+def _row(ws, values, style=None):
+    row = []
+    for value in values:
+        cell = WriteOnlyCell(ws, value=value)
+        if style:
+            cell.style = style
+        row.append(cell)
+    return row
+
+
+def _sheet_title(vessel, used):
+    base = _SHEET_TITLE_INVALID_RE.sub('_', vessel)[:_SHEET_TITLE_MAX] or 'Vessel'
+    title = base
+    suffix = 2
+    while title.lower() in used:
+        tag = f' ({suffix})'
+        title = base[:_SHEET_TITLE_MAX - len(tag)] + tag
+        suffix += 1
+    used.add(title.lower())
+    return title
+
+
+def fleet_summary_row(result):
+    """One line of the Fleet Summary sheet."""
+    counts = result['count_comparison_df']
+    title_comparison = result['title_comparison']
+    if counts is not None:
+        # process_files appends the TOTAL row last
+        machinery, totals = counts.iloc[:-1], counts.iloc[-1].tolist()
+        list_jobs, status_jobs, difference = (int(value) for value in totals[1:4])
+        machinery_count = len(machinery)
+        mismatched = int((machinery['Difference'] != 0).sum())
+    else:
+        list_jobs = status_jobs = difference = machinery_count = mismatched = None
+    return [
+        result['vessel'],
+        result['job_list_file'],
+        result['job_status_file'],
+        machinery_count,
+        mismatched,
+        list_jobs,
+        status_jobs,
+        difference,
+        len(title_comparison) if title_comparison is not None else None,
+        len(result['machinery_diff_list']),
+        result['error'] or 'OK',
+    ]
+
+
+FLEET_SUMMARY_COLUMNS = [
+    'Vessel',
+    'Job List File',
+    'Job Status File',
+    'Machinery Items',
+    'Items with Count Differences',
+    'Job List Jobs',
+    'Job Status Jobs',
+    'Job Difference',
+    'Machinery with Titles',
+    'Items with Different Titles',
+    'Status',
+]
+
+
+def prepare_fleet_report(results, unpaired=(), unreadable=()):
+    """Write the consolidated fleet workbook.
+
+    The first sheet summarizes every vessel, followed by the files that
+    could not be paired or read; each vessel then gets its own sheet with
+    the machinery count comparison followed by the machinery whose job
+    titles differ.
+    """
+    wb = Workbook(write_only=True)
+    for style in _fleet_styles():
+        wb.add_named_style(style)
+
+    summary = wb.create_sheet('Fleet Summary')
+    summary.append(_row(summary, FLEET_SUMMARY_COLUMNS, 'fleet_bold'))
+    for result in results:
+        row = fleet_summary_row(result)
+        flagged = result['error'] is not None or row[4] or row[9]
+        summary.append(_row(summary, row, 'fleet_flag' if flagged else None))
+    if unpaired:
+        summary.append([])
+        summary.append(_row(summary, ['Files without a matching export'], 'fleet_bold'))
+        for file_name in unpaired:
+            summary.append([file_name])
+    if unreadable:
+        summary.append([])
+        summary.append(_row(summary, ['Files that could not be read', 'Error'], 'fleet_bold'))
+        for file_name, error in unreadable:
+            summary.append(_row(summary, [file_name, error], 'fleet_flag'))
+
+    used = {'fleet summary'}
+    for result in results:
+        sheet = wb.create_sheet(_sheet_title(result['vessel'], used))
+        sheet.append(_row(sheet, [f"Job List: {result['job_list_file']}"], 'fleet_bold'))
+        sheet.append(_row(sheet, [f"Job Status: {result['job_status_file']}"], 'fleet_bold'))
+        if result['error'] is not None:
+            sheet.append(_row(sheet, ['Error', result['error']], 'fleet_flag'))
+            continue
+
+        counts = result['count_comparison_df']
+        sheet.append([])
+        sheet.append(_row(sheet, [str(column) for column in counts.columns], 'fleet_bold'))
+        for machinery, count1, count2, difference in counts.itertuples(index=False, name=None):
+            values = [machinery, int(count1), int(count2), int(difference)]
+            sheet.append(_row(sheet, values, 'fleet_flag' if difference and machinery != 'TOTAL' else None))
+
+        differences = result['title_comparison'].differences().to_display_frame()
+        sheet.append([])
+        sheet.append(_row(sheet, ['Machinery with different job titles'], 'fleet_bold'))
+        if differences.empty:
+            sheet.append(['None'])
+            continue
+        columns = ['Machinery', 'Common Titles'] + differences.columns[3:5].tolist()
+        sheet.append(_row(sheet, columns, 'fleet_bold'))
+        for values in differences[columns].itertuples(index=False, name=None):
+            sheet.append(list(values))
+
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def run_fleet(source, output_path, max_workers=None):
+    """Pair the exports in ``source``, compare every vessel and write the fleet workbook."""
+    pairs, unpaired, unreadable = pair_exports(read_export_files(source))
+    results = compare_fleet(pairs, max_workers=max_workers)
+    with open(output_path, 'wb') as report_file:
+        report_file.write(prepare_fleet_report(results, unpaired, unreadable))
+    return results, unpaired, unreadable
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare Job List and Job Status exports for a whole fleet.')
+    parser.add_argument('source', help='directory or zip archive of CSV exports')
+    parser.add_argument('output', help='path of the fleet Excel workbook to write')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    results, unpaired, unreadable = run_fleet(args.source, args.output, max_workers=args.workers)
+    failed = [result for result in results if result['error'] is not None]
+    print(
+        f"Compared {len(results)} vessels ({len(failed)} failed), {len(unpaired)} unpaired files, "
+        f"{len(unreadable)} unreadable files -> {args.output}"
+    )
+    return 1 if failed or unreadable else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,87 @@
+import re
+from collections import Counter, defaultdict
+
+DEFAULT_SIMILARITY = 0.8
+NGRAM_SIZE = 3
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def title_ngrams(title, n=NGRAM_SIZE):
+    """Character n-grams of a title after lowercasing and collapsing punctuation.
+
+    Word boundaries are padded with spaces, so ``"Overhaul Bowl"`` and
+    ``"overhaul, bowl"`` give the same set.
+    """
+    text = " " + " ".join(_WORD_RE.findall(str(title).lower())) + " "
+    return frozenset(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def similarity(first, second, n=NGRAM_SIZE):
+    """Dice coefficient of the two titles' n-gram sets, from 0.0 to 1.0."""
+    first_grams = title_ngrams(first, n)
+    second_grams = title_ngrams(second, n)
+    if not first_grams or not second_grams:
+        return 0.0
+    return 2 * len(first_grams & second_grams) / (len(first_grams) + len(second_grams))
+
+
+class TitleIndex:
+    """Inverted n-gram index over a group of titles.
+
+    ``candidates`` only visits titles that share at least one n-gram with
+    the query, counting the shared n-grams from the posting lists, so a
+    lookup costs the size of the postings it touches rather than one
+    comparison per indexed title.
+    """
+
+    def __init__(self, titles, n=NGRAM_SIZE):
+        self.n = n
+        self.titles = list(titles)
+        self.grams = [title_ngrams(title, n) for title in self.titles]
+        self.postings = defaultdict(list)
+        for position, grams in enumerate(self.grams):
+            for gram in grams:
+                self.postings[gram].append(position)
+
+    def candidates(self, title, threshold=DEFAULT_SIMILARITY):
+        """Yield ``(indexed_title, score)`` for every indexed title at or above ``threshold``."""
+        grams = title_ngrams(title, self.n)
+        if not grams:
+            return
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        for position, overlap in shared.items():
+            score = 2 * overlap / (len(grams) + len(self.grams[position]))
+            if score >= threshold:
+                yield self.titles[position], score
+
+
+def match_titles(first_titles, second_titles, threshold=DEFAULT_SIMILARITY, n=NGRAM_SIZE):
+    """Pair near-identical titles between two lists, each title used at most once.
+
+    Returns ``[(first_title, second_title, score)]``, best scores first. The
+    pairing is greedy on score, which is what a reviewer expects when one
+    title has several close candidates.
+    """
+    if not first_titles or not second_titles:
+        return []
+    index = TitleIndex(second_titles, n)
+    scored = [
+        (score, first_title, second_title)
+        for first_title in first_titles
+        for second_title, score in index.candidates(first_title, threshold)
+    ]
+    scored.sort(key=lambda match: (-match[0], match[1], match[2]))
+
+    matches = []
+    used_first = set()
+    used_second = set()
+    for score, first_title, second_title in scored:
+        if first_title in used_first or second_title in used_second:
+            continue
+        used_first.add(first_title)
+        used_second.add(second_title)
+        matches.append((first_title, second_title, score))
+    return matches
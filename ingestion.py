@@ -0,0 +1,337 @@
+import gzip
+import importlib.util
+import lzma
+import os
+import zipfile
+from contextlib import contextmanager
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import span
+from machinery_normalizer import normalize_machinery_series, rename_machinery
+
+# Column detection rules shared by the title and count comparisons
+TITLE_MACHINERY_COLUMNS = ['Machinery Location', 'Machinery']
+COUNT_MACHINERY_COLUMNS = ['Machinery', 'Machinery Location', 'Component Name', 'System Name']
+FIRST_FILE_TITLE_COLUMNS = ['Title', 'Job Title', 'Job Title.1']
+SECOND_FILE_TITLE_COLUMNS = ['Job Title', 'Title', 'Job Title.1']
+DEFAULT_CHUNK_ROWS = 100_000
+# Exports are often sent compressed over the satellite link; these are read as they decompress
+COMPRESSED_SUFFIXES = ('.zip', '.gz', '.xz')
+UPLOAD_TYPES = ['csv', 'zip', 'gz', 'xz']
+
+
+def find_column(columns, candidates):
+    """Return the first candidate present in ``columns``, or None."""
+    for column in candidates:
+        if column in columns:
+            return column
+    return None
+
+
+def machinery_columns(columns):
+    """Machinery columns the title and count comparisons will pick, without duplicates."""
+    found = [find_column(columns, TITLE_MACHINERY_COLUMNS), find_column(columns, COUNT_MACHINERY_COLUMNS)]
+    return [column for column in dict.fromkeys(found) if column is not None]
+
+
+def title_columns(columns):
+    """Title columns either side of the title comparison will pick, without duplicates."""
+    found = [find_column(columns, FIRST_FILE_TITLE_COLUMNS), find_column(columns, SECOND_FILE_TITLE_COLUMNS)]
+    return [column for column in dict.fromkeys(found) if column is not None]
+
+
+def pyarrow_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def is_compressed(file_name):
+    return file_name.lower().endswith(COMPRESSED_SUFFIXES)
+
+
+class JobExport:
+    """One uploaded CSV, parsed once and shared by both comparisons.
+
+    ``frame`` keeps the original column names. The machinery columns picked
+    by ``compare_titles`` and ``process_files`` already hold normalized
+    names, with missing values left as NaN.
+    """
+
+    def __init__(self, frame, file_name):
+        self.frame = frame
+        self.file_name = file_name
+        self._aggregates = {}
+
+    @classmethod
+    def from_aggregates(cls, frame, file_name, aggregates):
+        """An export whose aggregates were computed elsewhere, e.g. while streaming."""
+        export = cls(frame, file_name)
+        export._aggregates.update(aggregates)
+        return export
+
+    @property
+    def columns(self):
+        return self.frame.columns
+
+    def count_machinery(self, column):
+        """Normalized machinery column with missing names in their string form.
+
+        The count comparison has always counted missing names as ``"nan"``
+        rather than dropping them.
+        """
+        machinery = self.frame[column].astype(object)
+        missing = machinery.isna()
+        if missing.any():
+            machinery[missing] = rename_machinery(np.nan)
+        return machinery
+
+    def _memoized(self, key, compute):
+        if key not in self._aggregates:
+            self._aggregates[key] = compute()
+        return self._aggregates[key]
+
+    def title_pairs(self, machinery_column, title_column):
+        """Distinct ``(Machinery, Job Title)`` pairs as strings, for the title comparison.
+
+        Rows without a machinery name are left out; missing titles read
+        ``"nan"``. Computed once per export, so a cached export can be
+        compared again without touching its rows.
+        """
+        def compute():
+            pairs = self.frame[[machinery_column, title_column]].drop_duplicates()
+            pairs.columns = ['Machinery', 'Job Title']
+            pairs = pairs[pairs['Machinery'].notna()]
+            return pd.DataFrame({
+                'Machinery': pairs['Machinery'].astype(str),
+                'Job Title': pairs['Job Title'].astype(str),
+            })
+
+        return self._memoized(('title_pairs', machinery_column, title_column), compute)
+
+    def machinery_counts(self, column):
+        """Jobs per normalized machinery name, as used by the count comparison."""
+        return self._memoized(('machinery_counts', column), lambda: self.count_machinery(column).value_counts())
+
+
+def _read_options(header):
+    """Column positions to parse and their dtypes, from a sniffed header."""
+    text_columns = machinery_columns(header) + title_columns(header)
+    wanted = set(text_columns)
+    if 'Vessel' in header:
+        wanted.add('Vessel')
+    usecols = [position for position, column in enumerate(header) if column in wanted]
+    dtype = {column: 'category' for column in text_columns}
+    return usecols, dtype
+
+
+def _read_handle(handle):
+    usecols, dtype = _read_options(read_header(handle))
+    return pd.read_csv(handle, usecols=usecols, dtype=dtype)
+
+
+def read_job_export_frame(content, engine=None, file_name=None):
+    """Read only the columns the comparisons use from CSV bytes.
+
+    The header is sniffed first and only Vessel plus the machinery and title
+    columns resolved by the detection rules are parsed, with machinery and
+    titles loaded as ``category``. ``engine="pyarrow"`` is used when pyarrow
+    is installed and the header has no duplicate names (pyarrow cannot
+    select pandas' mangled ``Job Title.1`` style columns).
+
+    When ``file_name`` ends in ``.zip``, ``.gz`` or ``.xz`` the content is
+    parsed as it is decompressed (see ``open_export``).
+    """
+    if file_name and is_compressed(file_name):
+        with open_export(content, file_name) as (handle, _):
+            return _read_handle(handle)
+
+    header = pd.read_csv(BytesIO(content), nrows=0).columns.tolist()
+    usecols, dtype = _read_options(header)
+
+    if engine == 'pyarrow' and pyarrow_available():
+        raw_header = pd.read_csv(BytesIO(content), header=None, nrows=1, dtype=str).iloc[0].tolist()
+        if len(set(raw_header)) == len(raw_header):
+            names = [header[position] for position in usecols]
+            return pd.read_csv(BytesIO(content), usecols=names, dtype=dtype, engine='pyarrow')
+
+    return pd.read_csv(BytesIO(content), usecols=usecols, dtype=dtype)
+
+
+def load_job_export(content, file_name, engine=None):
+    """Parse CSV bytes and normalize the machinery columns once.
+
+    Compressed content is decompressed as it is parsed and the export is
+    named after the CSV inside it.
+    """
+    with span('read') as read_span:
+        if is_compressed(file_name):
+            with open_export(content, file_name) as (handle, file_name):
+                frame = _read_handle(handle)
+        else:
+            frame = read_job_export_frame(content, engine=engine)
+        read_span['rows'] = len(frame)
+    with span('normalization', rows=len(frame)):
+        for column in machinery_columns(frame.columns):
+            frame[column] = normalize_machinery_series(frame[column])
+    return JobExport(frame, file_name)
+
+
+def _open_source(source):
+    if isinstance(source, (bytes, bytearray)):
+        return BytesIO(source)
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, 'rb')
+    source.seek(0)
+    return source
+
+
+def _zip_member(archive, file_name):
+    members = [
+        info for info in archive.infolist()
+        if not info.is_dir() and info.filename.lower().endswith('.csv') and not info.filename.startswith('__MACOSX/')
+    ]
+    if len(members) != 1:
+        raise ValueError(f"{file_name} should contain exactly one CSV export, found {len(members)}")
+    return members[0]
+
+
+@contextmanager
+def open_export(source, file_name):
+    """Open an export for reading, decompressing it on the fly.
+
+    ``source`` is a path, a binary file object or bytes; ``file_name``
+    decides the format. A ``.zip`` must hold a single CSV; ``.gz`` and
+    ``.xz`` wrap one. Yields ``(handle, csv_name)``: a binary file object
+    over the CSV text, which is never held in memory as a whole, and the
+    name of the CSV inside (``file_name`` itself for a plain CSV).
+    """
+    lower = file_name.lower()
+    with _open_source(source) as raw:
+        if lower.endswith('.zip'):
+            with zipfile.ZipFile(raw) as archive:
+                member = _zip_member(archive, file_name)
+                with archive.open(member) as handle:
+                    yield handle, os.path.basename(member.filename)
+        elif lower.endswith('.gz'):
+            with gzip.open(raw) as handle:
+                yield handle, file_name[:-len('.gz')]
+        elif lower.endswith('.xz'):
+            with lzma.open(raw) as handle:
+                yield handle, file_name[:-len('.xz')]
+        else:
+            yield raw, file_name
+
+
+def read_header(handle):
+    """Column names of a CSV file object, leaving it rewound."""
+    header = pd.read_csv(handle, nrows=0).columns.tolist()
+    handle.seek(0)
+    return header
+
+
+class ExportAggregator:
+    """Running per-machinery aggregates of an export read in pieces.
+
+    Each ``add``-ed chunk has its machinery columns normalized (once per
+    distinct name) and is folded into job counts and distinct
+    machinery/title pairs, in first-seen order, so memory grows with the
+    number of distinct pairs rather than with the rows. Aggregators of
+    consecutive pieces of one file can be ``merge``-d in file order, which
+    gives the same result as reading the file in one go.
+    """
+
+    def __init__(self, header):
+        self.header = header
+        self.usecols, self.dtype = _read_options(header)
+        self.columns = [header[position] for position in self.usecols]
+        self.count_columns = machinery_columns(header)
+        self.pair_keys = [(machinery, title) for machinery in self.count_columns for title in title_columns(header)]
+        self.counts = {column: {} for column in self.count_columns}
+        self.pairs = {key: None for key in self.pair_keys}
+        self.vessel = np.nan
+        self.rows = 0
+
+    def _add_pairs(self, key, new_pairs):
+        if self.pairs[key] is not None:
+            new_pairs = pd.concat([self.pairs[key], new_pairs], ignore_index=True)
+        self.pairs[key] = new_pairs.drop_duplicates()
+
+    def _add_counts(self, column, counts):
+        running = self.counts[column]
+        for machinery, jobs in counts:
+            running[machinery] = running.get(machinery, 0) + int(jobs)
+
+    def add(self, chunk):
+        """Fold in a chunk parsed with ``usecols``/``dtype``."""
+        self.rows += len(chunk)
+        if pd.isna(self.vessel) and 'Vessel' in chunk.columns:
+            vessels = chunk['Vessel'].dropna()
+            if not vessels.empty:
+                self.vessel = vessels.iloc[0]
+        for column in self.count_columns:
+            chunk[column] = normalize_machinery_series(chunk[column])
+
+        chunk_export = JobExport(chunk, None)
+        for column in self.count_columns:
+            self._add_counts(column, chunk_export.count_machinery(column).value_counts(sort=False).items())
+        for key in self.pair_keys:
+            self._add_pairs(key, chunk_export.title_pairs(*key))
+
+    def merge(self, other):
+        """Fold in the aggregates of the piece of the file that follows this one."""
+        self.rows += other.rows
+        if pd.isna(self.vessel):
+            self.vessel = other.vessel
+        for column in self.count_columns:
+            self._add_counts(column, other.counts[column].items())
+        for key in self.pair_keys:
+            if other.pairs[key] is not None:
+                self._add_pairs(key, other.pairs[key])
+
+    def to_export(self, file_name):
+        """A ``JobExport`` carrying the aggregates ``compare_titles`` and ``process_files`` read.
+
+        Its ``frame`` keeps only the column names and the first vessel name.
+        """
+        aggregates = {}
+        for column, running in self.counts.items():
+            # Same order as Series.value_counts() on the whole column
+            machinery_counts = pd.Series(running, dtype='int64', name='count').sort_values(ascending=False)
+            machinery_counts.index.name = column
+            aggregates[('machinery_counts', column)] = machinery_counts
+        for key, key_pairs in self.pairs.items():
+            if key_pairs is None:
+                key_pairs = pd.DataFrame({'Machinery': pd.Series(dtype=object), 'Job Title': pd.Series(dtype=object)})
+            aggregates[('title_pairs',) + key] = key_pairs
+
+        frame = pd.DataFrame(
+            [[self.vessel if column == 'Vessel' else np.nan for column in self.columns]], columns=self.columns
+        )
+        return JobExport.from_aggregates(frame, file_name, aggregates)
+
+
+def stream_job_export(source, file_name, chunksize=DEFAULT_CHUNK_ROWS):
+    """Aggregate a CSV export chunk by chunk instead of loading every row.
+
+    ``source`` is a path, a binary file object or bytes, possibly
+    compressed (see ``open_export``). See ``ExportAggregator`` for what is
+    kept; the result compares exactly like ``load_job_export`` of the same
+    file.
+    """
+    with open_export(source, file_name) as (handle, csv_name):
+        aggregator = ExportAggregator(read_header(handle))
+        with span('streamed read') as read_span:
+            chunks = pd.read_csv(handle, usecols=aggregator.usecols, dtype=aggregator.dtype, chunksize=chunksize)
+            for chunk in chunks:
+                aggregator.add(chunk)
+            read_span['rows'] = aggregator.rows
+    return aggregator.to_export(csv_name)
+
+
+def as_job_export(content, file_name):
+    """Accept either raw CSV bytes or an already loaded JobExport."""
+    if isinstance(content, JobExport):
+        return content
+    return load_job_export(content, file_name)
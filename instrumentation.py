@@ -0,0 +1,100 @@
+import json
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_active_profile = ContextVar('active_profile', default=None)
+
+
+class Profile:
+    """Spans recorded while a ``profiling()`` block is active.
+
+    Each span is a dict with its ``name``, wall time in ``seconds``, the
+    number of ``rows`` it handled (when the stage sets it) and, when memory
+    tracing is on, the ``peak_memory_bytes`` allocated above the level the
+    span started at. Spans are meant to be sequential, not nested.
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.spans = []
+
+    @property
+    def total_seconds(self):
+        return sum(span['seconds'] for span in self.spans)
+
+    def to_dict(self):
+        return {'total_seconds': self.total_seconds, 'spans': self.spans}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def summary_frame(self):
+        """One row per span, for display."""
+        frame = pd.DataFrame(self.spans, columns=['name', 'seconds', 'rows', 'peak_memory_bytes'])
+        return pd.DataFrame({
+            'Stage': frame['name'],
+            'Time (ms)': (frame['seconds'] * 1000).round(1),
+            'Rows': frame['rows'].astype('Int64'),
+            'Peak Memory (MB)': (frame['peak_memory_bytes'].astype(float) / 1_000_000).round(2),
+        })
+
+
+@contextmanager
+def profiling(trace_memory=True):
+    """Collect the spans of everything run inside the block into a ``Profile``.
+
+    The finished profile is also emitted as one INFO log record, with the
+    spans attached as ``record.profile``. Tracing memory uses ``tracemalloc``,
+    which slows allocation-heavy code down noticeably; pass
+    ``trace_memory=False`` to record timings only.
+    """
+    profile = Profile(trace_memory=trace_memory)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    token = _active_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _active_profile.reset(token)
+        if started_tracing:
+            tracemalloc.stop()
+        logger.info(
+            "comparison profile: %s",
+            ", ".join(f"{span['name']} {span['seconds'] * 1000:.1f}ms" for span in profile.spans),
+            extra={'profile': profile.to_dict()},
+        )
+
+
+@contextmanager
+def span(name, rows=None):
+    """Time one pipeline stage; a no-op outside ``profiling()``.
+
+    Yields the span record, so the stage can fill in ``record['rows']``
+    once it knows them.
+    """
+    profile = _active_profile.get()
+    record = {'name': name, 'seconds': 0.0, 'rows': rows, 'peak_memory_bytes': None}
+    if profile is None:
+        yield record
+        return
+
+    tracing = profile.trace_memory and tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        memory_at_start = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = time.perf_counter() - start
+        if tracing:
+            record['peak_memory_bytes'] = max(0, tracemalloc.get_traced_memory()[1] - memory_at_start)
+        profile.spans.append(record)
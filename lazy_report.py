@@ -0,0 +1,36 @@
+import threading
+
+from instrumentation import span
+
+
+class LazyReport:
+    """Excel report bytes built on first request and then memoized.
+
+    The comparison engines return one of these instead of the workbook
+    itself, so uploads only pay for the tables that are shown. Calling it
+    builds the report once; later calls return the same bytes. It can be
+    handed straight to ``st.download_button(data=...)``, which only calls it
+    when the user clicks download.
+    """
+
+    def __init__(self, build, *args, name='excel build'):
+        self._build = build
+        self._args = args
+        self.name = name
+        self._data = None
+        # Streamlit runs download callables on a separate thread
+        self._lock = threading.Lock()
+
+    @property
+    def is_built(self):
+        return self._data is not None
+
+    def __call__(self):
+        with self._lock:
+            if self._data is None:
+                # Recorded as a span when built inside profiling()
+                with span(self.name):
+                    self._data = self._build(*self._args)
+                # The inputs are no longer needed once the bytes exist
+                self._args = ()
+            return self._data
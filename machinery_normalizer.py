@@ -0,0 +1,304 @@
+import csv
+import hashlib
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from normalization_cache import DEFAULT_MAX_ENTRIES, NormalizationCache
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_DASH_RE = re.compile(r"[–—]")
+_REGEX_METACHARS = set(".^$*+?{}[]|()")
+_MAX_OPTIONAL_CHARS = 4
+
+# Rules are shared by every comparison; point MACHINERY_RULES_PATH at a copy
+# of the file to try vessel-specific rules without touching the code
+RULES_PATH = os.environ.get(
+    "MACHINERY_RULES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "machinery_rules.csv"),
+)
+RULE_STAGES = ("specific", "suffix", "legacy")
+RULE_FIELDS = ("stage", "group", "pattern", "replacement")
+
+
+def read_rules(rules_file, source="rules"):
+    """Parse rule rows from an open CSV file; ``source`` names it in errors."""
+    rules = {stage: {} for stage in RULE_STAGES}
+    for row in csv.DictReader(rules_file):
+        stage = row["stage"].strip()
+        if stage not in rules:
+            raise ValueError(f"Unknown rule stage {stage!r} in {source}")
+        rules[stage][row["pattern"]] = row["replacement"]
+    return rules
+
+
+def load_rules(path=RULES_PATH):
+    """Read the rule registry into ``{stage: {pattern: replacement}}``.
+
+    Rows keep their file order within a stage; if a pattern is listed twice
+    the first position wins and the last replacement is kept, as with the
+    Python dict literals the rules used to live in.
+    """
+    with open(path, newline="", encoding="utf-8") as rules_file:
+        return read_rules(rules_file, path)
+
+
+def rules_version(rules):
+    """Short hash identifying a rule set, for keying cached results."""
+    digest = hashlib.sha256()
+    for stage in RULE_STAGES:
+        for pattern, replacement in rules.get(stage, {}).items():
+            digest.update(f"{stage}\0{pattern}\0{replacement}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def clean_machinery_value(value):
+    """Convert to string and normalize whitespace & dashes."""
+    cleaned = str(value).strip()
+    cleaned = _WHITESPACE_RE.sub(" ", cleaned)    # normalize multiple spaces
+    return _DASH_RE.sub("-", cleaned)             # normalize all dash types to hyphen
+
+
+def _expand_anchored_literal(pattern):
+    """Return every string an anchored pattern like ``^Name-?P$`` can match.
+
+    Returns None when the pattern is a real regex (character classes,
+    repetition, alternation, ...) so the caller keeps it as a regex rule.
+    """
+    if len(pattern) < 2 or not pattern.startswith("^") or not pattern.endswith("$"):
+        return None
+    body = pattern[1:-1]
+    if body.endswith("\\") and not body.endswith("\\\\"):
+        return None
+
+    atoms = []  # [char, optional]
+    i = 0
+    while i < len(body):
+        char = body[i]
+        if char == "\\":
+            escaped = body[i + 1] if i + 1 < len(body) else ""
+            if not escaped or escaped.isalnum():
+                return None
+            atoms.append([escaped, False])
+            i += 2
+        elif char == "?":
+            if not atoms or atoms[-1][1]:
+                return None
+            atoms[-1][1] = True
+            i += 1
+        elif char in _REGEX_METACHARS:
+            return None
+        else:
+            atoms.append([char, False])
+            i += 1
+
+    if sum(optional for _, optional in atoms) > _MAX_OPTIONAL_CHARS:
+        return None
+
+    variants = [""]
+    for char, optional in atoms:
+        if optional:
+            variants = [v + char for v in variants] + variants
+        else:
+            variants = [v + char for v in variants]
+    return variants
+
+
+def _combine_rules(indexed_patterns, prefix):
+    """Join ``(index, pattern)`` pairs into one alternation tried in rule order."""
+    if not indexed_patterns:
+        return None
+    alternation = "|".join(f"(?P<{prefix}{index}>{pattern})" for index, pattern in indexed_patterns)
+    return re.compile(alternation, flags=re.IGNORECASE)
+
+
+def _matched_rule_index(match, prefix):
+    # The outer named group closes last, so lastgroup names the rule that matched
+    return int(match.lastgroup[len(prefix):])
+
+
+class MachineryNormalizer:
+    """Precompiled form of the machinery renaming rules.
+
+    Behaves exactly like scanning ``specific_mapping`` and then
+    ``suffix_mapping`` with ``re.match(..., flags=re.IGNORECASE)`` and
+    returning the first hit, but does the work once at construction:
+
+    - anchored literal rules (``^Chain LockerP1$``, ``^Provision CraneA-?P$``)
+      become a case-folded exact-lookup table
+    - the remaining specific rules become one combined alternation
+    - the suffix rules become one combined alternation
+
+    An optional persistent ``cache`` (see ``normalization_cache``) lets warm
+    runs skip the rules entirely for names seen before.
+    """
+
+    def __init__(self, specific_mapping, suffix_mapping, cache=None):
+        self.version = rules_version({"specific": specific_mapping, "suffix": suffix_mapping})
+        self.cache = cache
+        self.specific_rules = list(specific_mapping.items())
+        self.suffix_rules = [
+            (re.compile(pattern, flags=re.IGNORECASE), replacement)
+            for pattern, replacement in suffix_mapping.items()
+        ]
+
+        self._literal_lookup = {}
+        regex_rules = []
+        for index, (pattern, _) in enumerate(self.specific_rules):
+            variants = _expand_anchored_literal(pattern)
+            if variants is None or not all(v.isascii() for v in variants):
+                regex_rules.append((index, pattern))
+                continue
+            for variant in variants:
+                # Earlier rules win, exactly as in the sequential scan
+                self._literal_lookup.setdefault(variant.lower(), index)
+
+        self._specific_regex = _combine_rules(regex_rules, "r")
+        # Non-ASCII input can case-fold differently under re.IGNORECASE, so it
+        # skips the lookup table and goes through every specific rule as regex
+        self._specific_fallback = _combine_rules(list(enumerate(p for p, _ in self.specific_rules)), "r")
+        self._suffix_regex = _combine_rules(
+            [(index, rule.pattern) for index, (rule, _) in enumerate(self.suffix_rules)], "s"
+        )
+
+    def _specific_rule_index(self, value):
+        if not value.isascii():
+            match = self._specific_fallback.match(value) if self._specific_fallback else None
+            return _matched_rule_index(match, "r") if match else None
+
+        index = self._literal_lookup.get(value.lower())
+        if self._specific_regex is not None:
+            match = self._specific_regex.match(value)
+            if match:
+                regex_index = _matched_rule_index(match, "r")
+                if index is None or regex_index < index:
+                    index = regex_index
+        return index
+
+    def matches_rule(self, value):
+        """Whether a specific or suffix rule applies to ``value``, rather than it passing through."""
+        cleaned = clean_machinery_value(value)
+        if self._specific_rule_index(cleaned) is not None:
+            return True
+        return self._suffix_regex is not None and self._suffix_regex.match(cleaned) is not None
+
+    def _apply_rules(self, value):
+        cleaned = clean_machinery_value(value)
+
+        # Priority 1: Specific edge-case replacements
+        index = self._specific_rule_index(cleaned)
+        if index is not None:
+            return self.specific_rules[index][1]
+
+        # Priority 2: Generic suffix replacements for standard machinery types
+        if self._suffix_regex is not None:
+            match = self._suffix_regex.match(cleaned)
+            if match:
+                rule, replacement = self.suffix_rules[_matched_rule_index(match, "s")]
+                return rule.sub(replacement, cleaned).strip()
+
+        return cleaned
+
+    def normalize(self, value):
+        """Return the standardized machinery name for a raw value."""
+        if self.cache is None:
+            return self._apply_rules(value)
+        return self.normalize_many([value])[0]
+
+    __call__ = normalize
+
+    def normalize_many(self, values):
+        """Normalize a list of values, consulting the persistent cache in bulk."""
+        if self.cache is None:
+            return [self._apply_rules(value) for value in values]
+
+        raw_values = [str(value) for value in values]
+        known = self.cache.get_many(raw_values)
+        computed = {raw: self._apply_rules(raw) for raw in raw_values if raw not in known}
+        self.cache.put_many(computed)
+        known.update(computed)
+        return [known[raw] for raw in raw_values]
+
+    def normalize_series(self, series, na_action="ignore"):
+        """Normalize a whole Series, running the rules once per distinct value.
+
+        Job exports repeat a few hundred machinery names across tens of
+        thousands of rows, so the column is factorized, each unique value is
+        normalized once and the results are mapped back through the codes.
+
+        With ``na_action="ignore"`` missing values are passed through
+        untouched, matching ``rename_machinery(str(x)) if pd.notna(x) else x``.
+        With ``na_action=None`` they are normalized like any other value,
+        matching ``series.apply(rename_machinery)``.
+        """
+        codes, uniques = pd.factorize(series)
+        normalized = np.array(self.normalize_many(list(uniques)), dtype=object)
+        present = codes >= 0
+
+        if isinstance(series.dtype, pd.CategoricalDtype) and na_action == "ignore":
+            # Stay categorical; several raw names can share one normalized name
+            normalized_codes, categories = pd.factorize(normalized)
+            result_codes = np.full(len(codes), -1, dtype=normalized_codes.dtype)
+            result_codes[present] = normalized_codes[codes[present]]
+            result = pd.Categorical.from_codes(result_codes, categories=categories)
+            return pd.Series(result, index=series.index, name=series.name)
+
+        result = np.empty(len(codes), dtype=object)
+        result[present] = normalized[codes[present]]
+        if not present.all():
+            missing = series.to_numpy(dtype=object)[~present]
+            if na_action is None:
+                missing = self.normalize_many(list(missing))
+            result[~present] = missing
+
+        return pd.Series(result, index=series.index, name=series.name)
+
+
+def measure_throughput(normalizer, values):
+    """Normalize ``values`` once and return the rate in names per second."""
+    start = time.perf_counter()
+    for value in values:
+        normalizer(value)
+    elapsed = time.perf_counter() - start
+    return len(values) / elapsed if elapsed else float("inf")
+
+
+MACHINERY_RULES = load_rules()
+RULES_VERSION = rules_version(MACHINERY_RULES)
+default_normalizer = MachineryNormalizer(MACHINERY_RULES["specific"], MACHINERY_RULES["suffix"])
+
+
+def configure_persistent_cache(path, max_entries=DEFAULT_MAX_ENTRIES):
+    """Memoize normalized names on disk across sessions; ``path=None`` turns it off."""
+    if default_normalizer.cache is not None:
+        default_normalizer.cache.close()
+    default_normalizer.cache = (
+        NormalizationCache(path, default_normalizer.version, max_entries) if path else None
+    )
+    return default_normalizer.cache
+
+
+if os.environ.get("MACHINERY_CACHE_PATH"):
+    configure_persistent_cache(os.environ["MACHINERY_CACHE_PATH"])
+
+
+def rename_machinery(value):
+    """Standardize a machinery name using the shared rule registry."""
+    return default_normalizer(value)
+
+
+def normalize_machinery_series(series, na_action="ignore"):
+    """Standardize a whole column of machinery names, once per distinct value."""
+    return default_normalizer.normalize_series(series, na_action=na_action)
+
+
+if __name__ == "__main__":
+    import random
+
+    samples = [pattern.strip("^$").replace("-?", "-").replace("\\", "") for pattern in MACHINERY_RULES["specific"]]
+    samples += ["Main EngineAft", "Fire PumpStarboard", "Boiler Feed Pump-Stbd", "Purifier No.1"]
+    column = [random.choice(samples) for _ in range(100_000)]
+    print(f"{measure_throughput(default_normalizer, column):,.0f} names/sec over {len(column):,} names")
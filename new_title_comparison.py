@@ -1,10 +1,23 @@
 import pandas as pd
-import streamlit as st
 from io import BytesIO
-import re
+import logging
 import os
 from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font, Alignment
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Font, Alignment, NamedStyle
+from openpyxl.utils import get_column_letter
+from ingestion import (
+    FIRST_FILE_TITLE_COLUMNS,
+    SECOND_FILE_TITLE_COLUMNS,
+    TITLE_MACHINERY_COLUMNS,
+    as_job_export,
+    find_column,
+)
+from instrumentation import span
+from lazy_report import LazyReport
+from title_diff import COUNT_COLUMNS, TitleComparison
+
+logger = logging.getLogger(__name__)
 
 
 def extract_date_from_filename(filename):
@@ -28,550 +41,50 @@ def get_vessel_name(df):
     return "Unknown Vessel"
 
 
-def rename_machinery(value):
-     # Step 1: Convert to string and normalize whitespace & dashes
-    original_value = str(value).strip()
-    original_value = re.sub(r"\s+", " ", original_value)         # normalize multiple spaces
-    original_value = re.sub(r"[–—]", "-", original_value)        # normalize all dash types to hyphen
-    compact_value = re.sub(r"\s+", "", original_value)  
-
-    # Priority 1: Specific edge-case replacements
-    specific_mapping = {
-        # Provision Cranes (existing + new)
-        r"^Provision CraneA-?P$": "Provision Crane A-P",
-        r"^Provision CraneAft-?Port$": "Provision Crane A-P",
-        r"^Provision CraneF-?P$": "Provision Crane F-P",
-        r"^Provision CraneF-?S$": "Provision Crane F-S",
-        r"^Provision CraneFwd-?P$": "Provision Crane F-P",
-        r"^Provision CraneFwd-?Port$": "Provision Crane F-P",
-        r"^Provision CraneFwd-?Stbd$": "Provision Crane F-S",
-        r"^Provision Crane F-S$": "Provision Crane F-S",
-        r"^Provision CraneP1$": "Provision Crane P1",
-        r"^Provision CranePort1$": "Provision Crane P1",
-        r"^Provision CraneS1$": "Provision Crane S1",
-        r"^Provision CraneStarboard1$": "Provision Crane S1",
-
-        # Liferaft/Rescue Davits
-        r"^Liferaft/Rescue Boat DavitS$": "Liferaft/Rescue Boat Davit S",
-        r"^Liferaft/Rescue Boat DavitStarboard$": "Liferaft/Rescue Boat Davit S",
-
-        # Rescue Boat
-        r"^Rescue BoatS$": "Rescue Boat S",
-        r"^Rescue BoatStarboard$": "Rescue Boat S",
-
-        # Chain Locker
-        r"^Chain LockerP1$": "Chain Locker P1",
-        r"^Chain LockerPort1$": "Chain Locker P1",
-        r"^Chain LockerS1$": "Chain Locker S1",
-        r"^Chain LockerStarboard1$": "Chain Locker S1",
-
-        # Combined Windlass Mooring Winch
-        r"^Combined Windlass Mooring WinchF1$": "Combined Windlass Mooring Winch F1",
-        r"^Combined Windlass Mooring WinchF2$": "Combined Windlass Mooring Winch F2",
-        r"^Combined Windlass Mooring WinchForward1$": "Combined Windlass Mooring Winch F1",
-        r"^Combined Windlass Mooring WinchForward2$": "Combined Windlass Mooring Winch F2",
-
-        # Mooring Winch
-        r"^Mooring WinchA1$": "Mooring Winch A1",
-        r"^Mooring WinchA2$": "Mooring Winch A2",
-        r"^Mooring WinchAft1$": "Mooring Winch A1",
-        r"^Mooring WinchAft2$": "Mooring Winch A2",
-
-        # Muster Station
-        r"^Muster StationA1$": "Muster Station A1",
-        r"^Muster StationAft1$": "Muster Station A1",
-
-        # Accommodation Ladder
-        r"^Accommodation LadderP1$": "Accommodation Ladder P1",
-        r"^Accommodation LadderPort1$": "Accommodation Ladder P1",
-        r"^Accommodation LadderS1$": "Accommodation Ladder S1",
-        r"^Accommodation LadderStarboard1$": "Accommodation Ladder S1",
-
-        # Anchor Chain Cable
-        r"^Anchor Chain CableP1$": "Anchor Chain Cable P1",
-        r"^Anchor Chain CablePort1$": "Anchor Chain Cable P1",
-        r"^Anchor Chain CableS1$": "Anchor Chain Cable S1",
-        r"^Anchor Chain CableStarboard1$": "Anchor Chain Cable S1",
-
-        # Anchor
-        r"^AnchorP1$": "Anchor P1",
-        r"^AnchorPort1$": "Anchor P1",
-        r"^AnchorS1$": "Anchor S1",
-        r"^AnchorStarboard1$": "Anchor S1",
-
-        # Pilot Combination Ladder
-         # Pilot Combination Ladder
-    r"^Pilot Combination LadderP1$": "Pilot Combination Ladder P1",
-    r"^Pilot Combination LadderPort1$": "Pilot Combination Ladder P1",
-    r"^Pilot Combination LadderS1$": "Pilot Combination Ladder S1",
-    r"^Pilot Combination LadderStarboard1$": "Pilot Combination Ladder S1",
-
-    # Bunker Davit
-    r"^Bunker DavitP1$": "Bunker Davit P1",
-    r"^Bunker DavitPort1$": "Bunker Davit P1",
-    r"^Bunker DavitS1$": "Bunker Davit S1",
-    r"^Bunker DavitStarboard1$": "Bunker Davit S1",
-
-    # Combined Windlass Mooring Winch
-    r"^Combined Windlass Mooring WinchP1$": "Combined Windlass Mooring Winch P1",
-    r"^Combined Windlass Mooring WinchPort1$": "Combined Windlass Mooring Winch P1",
-    r"^Combined Windlass Mooring WinchS1$": "Combined Windlass Mooring Winch S1",
-    r"^Combined Windlass Mooring WinchStarboard1$": "Combined Windlass Mooring Winch S1",
-
-    # Pilot Ladder Davit
-    r"^Pilot Ladder DavitP1$": "Pilot Ladder Davit P1",
-    r"^Pilot Ladder DavitPort1$": "Pilot Ladder Davit P1",
-    r"^Pilot Ladder DavitS2$": "Pilot Ladder Davit S1",
-    r"^Pilot Ladder DavitStarboard2$": "Pilot Ladder Davit S1",
-
-    # Seaway Equipment
-    r"^Seaway EquipmentP1$": "Seaway Equipment P1",
-    r"^Seaway EquipmentPort1$": "Seaway Equipment P1",
-    r"^Seaway EquipmentS1$": "Seaway Equipment S1",
-    r"^Seaway EquipmentStarboard1$": "Seaway Equipment S1",
-
-    # Lifeboat
-    r"^LifeboatA1$": "Lifeboat A1",
-    r"^LifeboatAft1$": "Lifeboat A1",
-
-    # Liferaft Embarkation Ladder
-    r"^Liferaft Embarkation LadderF1$": "Liferaft Embarkation Ladder F1",
-    r"^Liferaft Embarkation LadderForward1$": "Liferaft Embarkation Ladder F1",
-    r"^Liferaft Embarkation LadderP1$": "Liferaft Embarkation Ladder P1",
-    r"^Liferaft Embarkation LadderPort1$": "Liferaft Embarkation Ladder P1",
-    r"^Liferaft Embarkation LadderS1$": "Liferaft Embarkation Ladder S1",
-    r"^Liferaft Embarkation LadderStarboard1$": "Liferaft Embarkation Ladder S1",
-
-    # Liferaft
-    r"^LiferaftP1$": "Liferaft P1",
-    r"^LiferaftPort1$": "Liferaft P1",
-    r"^LiferaftP2$": "Liferaft P2",
-    r"^LiferaftPort2$": "Liferaft P2",
-    r"^LiferaftS1$": "Liferaft S1",
-    r"^LiferaftStarboard1$": "Liferaft S1",
-    r"^LiferaftS2$": "Liferaft S2",
-    r"^LiferaftStarboard2$": "Liferaft S2",
-
-    # Mooring Winch
-    r"^Mooring WinchA3$": "Mooring Winch A3",
-    r"^Mooring WinchAft3$": "Mooring Winch A3",
-    r"^Mooring WinchA4$": "Mooring Winch A4",
-    r"^Mooring WinchAft4$": "Mooring Winch A4",
-    r"^Mooring WinchF1$": "Mooring Winch F1",
-    r"^Mooring WinchForward1$": "Mooring Winch F1",
-    r"^Mooring WinchF2$": "Mooring Winch F2",
-    r"^Mooring WinchForward2$": "Mooring Winch F2",
-
-    # Pilot Ladder
-    r"^Pilot LadderP1$": "Pilot Ladder P1",
-    r"^Pilot LadderPort1$": "Pilot Ladder P1",
-    r"^Pilot LadderS1$": "Pilot Ladder S1",
-    r"^Pilot LadderStarboard1$": "Pilot Ladder S1",
-
-    # Rescue Boat
-    r"^Rescue BoatP1$": "Rescue Boat P1",
-    r"^Rescue BoatPort1$": "Rescue Boat P1",
-
-    r"^Combined Mooring Winch Hydraulic UnitF1$": "Combined Mooring Winch Hydraulic Unit F1",
-    r"^Combined Mooring Winch Hydraulic UnitForward1$": "Combined Mooring Winch Hydraulic Unit F1",
-
-    # Emergency Towing System
-    r"^Emergency Towing SystemA1$": "Emergency Towing System A1",
-    r"^Emergency Towing SystemAft1$": "Emergency Towing System A1",
-    r"^Emergency Towing SystemF1$": "Emergency Towing System F1",
-    r"^Emergency Towing SystemForward1$": "Emergency Towing System F1",
-
-    # Liferaft 15
-    r"^Liferaft 15P1$": "Liferaft 15P1",
-    r"^Liferaft 15P2$": "Liferaft 15P2",
-    r"^Liferaft 15Port1$": "Liferaft 15P1",
-    r"^Liferaft 15Port2$": "Liferaft 15P2",
-
-    # Liferaft 6PF
-    r"^Liferaft 6PF-P1$": "Liferaft 6PF-P1",
-    r"^Liferaft 6PFwd-Port1$": "Liferaft 6PF-P1",
-
-    # Liferaft Embarkation Ladder F-*
-    r"^Liferaft Embarkation LadderF-P1$": "Liferaft Embarkation Ladder F-P1",
-    r"^Liferaft Embarkation LadderF-S1$": "Liferaft Embarkation Ladder F-S1",
-    r"^Liferaft Embarkation LadderFwd-Port1$": "Liferaft Embarkation Ladder F-P1",
-    r"^Liferaft Embarkation LadderFwd-Stbd1$": "Liferaft Embarkation Ladder F-S1",
-
-    # Mooring Winch Hydraulic Unit
-    r"^Mooring Winch Hydraulic UnitA1$": "Mooring Winch Hydraulic Unit A1",
-    r"^Mooring Winch Hydraulic UnitAft1$": "Mooring Winch Hydraulic Unit A1",
-
-    # Rescue Boat S
-    r"^Rescue BoatS1$": "Rescue Boat S1",
-    r"^Rescue BoatStarboard1$": "Rescue Boat S1",
-
-    # SART
-    r"^SARTP1$": "SART P1",
-    r"^SARTPort1$": "SART P1",
-    r"^SARTS1$": "SART S1",
-    r"^SARTStarboard1$": "SART S1",  
-
-    # Liferaft 15PPort
-    r"^Liferaft 15PPort1$": "Liferaft 15PP1",
-    r"^Liferaft 15PPort2$": "Liferaft 15PP2", 
-    # ICCP
-    r"^ICCPA1$": "ICCP A1",
-    r"^ICCPAft1$": "ICCP A1",
-    r"^ICCPF1$": "ICCP F1",
-    r"^ICCPForward1$": "ICCP F1",
-
-    # Slewing Fuel Hose Crane
-    r"^Slewing Fuel Hose CraneP1$": "Slewing Fuel Hose Crane P1",
-    r"^Slewing Fuel Hose CranePort1$": "Slewing Fuel Hose Crane P1",
-    r"^Slewing Fuel Hose CraneS1$": "Slewing Fuel Hose Crane S1",
-    r"^Slewing Fuel Hose CraneStarboard1$": "Slewing Fuel Hose Crane S1",
-
-     # Combined Windlass Mooring Winch F-*
-    r"^Combined Windlass Mooring WinchF-P1$": "Combined Windlass Mooring Winch F-P1",
-    r"^Combined Windlass Mooring WinchF-S1$": "Combined Windlass Mooring Winch F-S1",
-    r"^Combined Windlass Mooring WinchFwd-Port1$": "Combined Windlass Mooring Winch F-P1",
-    r"^Combined Windlass Mooring WinchFwd-Stbd1$": "Combined Windlass Mooring Winch F-S1",
-
-    # Lifeboat Davit
-    r"^Lifeboat DavitP1$": "Lifeboat Davit P1",
-    r"^Lifeboat DavitPort1$": "Lifeboat Davit P1",
-
-    # Lifeboat
-    r"^LifeboatP1$": "Lifeboat P1",
-    r"^LifeboatPort1$": "Lifeboat P1",
-
-    # Liferaft Embarkation Ladder P2/S2
-    r"^Liferaft Embarkation LadderP2$": "Liferaft Embarkation Ladder P2",
-    r"^Liferaft Embarkation LadderPort2$": "Liferaft Embarkation Ladder P2",
-    r"^Liferaft Embarkation LadderS2$": "Liferaft Embarkation Ladder S2",
-    r"^Liferaft Embarkation LadderStarboard2$": "Liferaft Embarkation Ladder S2",
-
-    # Liferaft/Rescue Boat Davit
-    r"^Liferaft/Rescue Boat DavitS1$": "Liferaft/Rescue Boat Davit S1",
-    r"^Liferaft/Rescue Boat DavitStarboard1$": "Liferaft/Rescue Boat Davit S1",
-
-    # Mooring Winch Centre
-    r"^Mooring WinchC1$": "Mooring Winch C1",
-    r"^Mooring WinchCentre1$": "Mooring Winch C1",
-
-    # Hatch Cover Aft to A mapping
-    r"^Hatch CoverA1$": "Hatch Cover A1",
-    r"^Hatch CoverA2$": "Hatch Cover A2",
-    r"^Hatch CoverA3$": "Hatch Cover A3",
-    r"^Hatch CoverA4$": "Hatch Cover A4",
-    r"^Hatch CoverA5$": "Hatch Cover A5",
-    r"^Hatch CoverA6$": "Hatch Cover A6",
-    r"^Hatch CoverA7$": "Hatch Cover A7",
-    r"^Hatch CoverAft1$": "Hatch Cover A1",
-    r"^Hatch CoverAft2$": "Hatch Cover A2",
-    r"^Hatch CoverAft3$": "Hatch Cover A3",
-    r"^Hatch CoverAft4$": "Hatch Cover A4",
-    r"^Hatch CoverAft5$": "Hatch Cover A5",
-    r"^Hatch CoverAft6$": "Hatch Cover A6",
-    r"^Hatch CoverAft7$": "Hatch Cover A7",
-
-    # Hatch Cover Centre to C mapping
-    r"^Hatch CoverC1$": "Hatch Cover C1",
-    r"^Hatch CoverC2$": "Hatch Cover C2",
-    r"^Hatch CoverCentre1$": "Hatch Cover C1",
-    r"^Hatch CoverCentre2$": "Hatch Cover C2",
-
-    # Hatch Cover Forward to F mapping
-    r"^Hatch CoverF1$": "Hatch Cover F1",
-    r"^Hatch CoverF2$": "Hatch Cover F2",
-    r"^Hatch CoverF3$": "Hatch Cover F3",
-    r"^Hatch CoverF4$": "Hatch Cover F4",
-    r"^Hatch CoverF5$": "Hatch Cover F5",
-    r"^Hatch CoverF6$": "Hatch Cover F6",
-    r"^Hatch CoverF7$": "Hatch Cover F7",
-    r"^Hatch CoverForward1$": "Hatch Cover F1",
-    r"^Hatch CoverForward2$": "Hatch Cover F2",
-    r"^Hatch CoverForward3$": "Hatch Cover F3",
-    r"^Hatch CoverForward4$": "Hatch Cover F4",
-    r"^Hatch CoverForward5$": "Hatch Cover F5",
-    r"^Hatch CoverForward6$": "Hatch Cover F6",
-    r"^Hatch CoverForward7$": "Hatch Cover F7",
-
-  # Mooring Winch Centre to C mapping (corrected)
-    r"^Mooring WinchC2$": "Mooring Winch C2",
-    r"^Mooring WinchCentre2$": "Mooring Winch C2",
-
-    # Mooring Winch P variants
-    r"^Mooring WinchP1$": "Mooring Winch P1",
-    r"^Mooring WinchP2$": "Mooring Winch P2",
-    r"^Mooring WinchP3$": "Mooring Winch P3",
-    r"^Mooring WinchPort1$": "Mooring Winch P1",
-    r"^Mooring WinchPort2$": "Mooring Winch P2",
-    r"^Mooring WinchPort3$": "Mooring Winch P3",
-
-    # Mooring Winch S variants
-    r"^Mooring WinchS1$": "Mooring Winch S1",
-    r"^Mooring WinchS2$": "Mooring Winch S2",
-    r"^Mooring WinchStarboard1$": "Mooring Winch S1",
-    r"^Mooring WinchStarboard2$": "Mooring Winch S2",
-
-    # Lifeboat/Rescue Boat
-    r"^Lifeboat/Rescue BoatS1$": "Lifeboat/Rescue Boat S1",
-    r"^Lifeboat/Rescue BoatStarboard1$": "Lifeboat/Rescue Boat S1",
-
-    # Liferaft F1 / Forward1
-    r"^LiferaftF1$": "Liferaft F1",
-    r"^LiferaftForward1$": "Liferaft F1",
-
-    # Muster Station
-    r"^Muster StationP1$": "Muster Station P1",
-    r"^Muster StationPort1$": "Muster Station P1",
-    r"^Muster StationS1$": "Muster Station S1",
-    r"^Muster StationStarboard1$": "Muster Station S1",
-
-        # Pilot Combination Ladder P2
-    r"^Pilot Combination LadderP2$": "Pilot Combination Ladder P2",
-    r"^Pilot Combination LadderPort2$": "Pilot Combination Ladder P2",
-
-    
-    # Liferaft Forward Port/Starboard
-    r"^LiferaftFP$": "Liferaft FP",
-    r"^LiferaftFS$": "Liferaft FS",
-    r"^LiferaftFwd-P$": "Liferaft FP",
-    r"^LiferaftFwdS$": "Liferaft FS",
-
-    # Lifeboat Davit
-    r"^Lifeboat DavitS1$": "Lifeboat Davit S1",
-    r"^Lifeboat DavitStarboard1$": "Lifeboat Davit S1",
-
-    # Lifeboat/Rescue Boat
-    r"^Lifeboat/Rescue BoatP1$": "Lifeboat/Rescue Boat P1",
-    r"^Lifeboat/Rescue BoatPort1$": "Lifeboat/Rescue Boat P1",
-
-    # Lifeboat
-    r"^LifeboatS1$": "Lifeboat S1",
-    r"^LifeboatStarboard1$": "Lifeboat S1",
-
-    # Liferaft 16 Person
-    r"^Liferaft 16 PersonP1$": "Liferaft 16 Person P1",
-    r"^Liferaft 16 PersonP2$": "Liferaft 16 Person P2",
-    r"^Liferaft 16 PersonPort1$": "Liferaft 16 Person P1",
-    r"^Liferaft 16 PersonPort2$": "Liferaft 16 Person P2",
-    r"^Liferaft 16 PersonS1$": "Liferaft 16 Person S1",
-    r"^Liferaft 16 PersonS2$": "Liferaft 16 Person S2",
-    r"^Liferaft 16 PersonStarboard1$": "Liferaft 16 Person S1",
-    r"^Liferaft 16 PersonStarboard2$": "Liferaft 16 Person S2",
-
-    # Liferaft 6 Person
-    r"^Liferaft 6 PersonF-P1$": "Liferaft 6 Person F-P1",
-    r"^Liferaft 6 PersonFwd-Port1$": "Liferaft 6 Person F-P1",
-
-    # Liferaft/Rescue Boat Davit
-    r"^Liferaft/Rescue Boat DavitP1$": "Liferaft/Rescue Boat Davit P1",
-    r"^Liferaft/Rescue Boat DavitPort1$": "Liferaft/Rescue Boat Davit P1",
-
-    # Mooring Winch M
-    r"^Mooring WinchM1$": "Mooring Winch M1",
-    r"^Mooring WinchM2$": "Mooring Winch M2",
-    r"^Mooring WinchM3$": "Mooring Winch M3",
-    r"^Mooring WinchM4$": "Mooring Winch M4",
-    r"^Mooring WinchM5$": "Mooring Winch M5",
-    r"^Mooring WinchM6$": "Mooring Winch M6",
-    r"^Mooring WinchMiddle1$": "Mooring Winch M1",
-    r"^Mooring WinchMiddle2$": "Mooring Winch M2",
-    r"^Mooring WinchMiddle3$": "Mooring Winch M3",
-    r"^Mooring WinchMiddle4$": "Mooring Winch M4",
-    r"^Mooring WinchMiddle5$": "Mooring Winch M5",
-    r"^Mooring WinchMiddle6$": "Mooring Winch M6",
-
-        # Liferaft/Rescue Boat Davit S2
-    r"^Liferaft/Rescue Boat DavitS2$": "Liferaft/Rescue Boat Davit S2",
-    r"^Liferaft/Rescue Boat DavitStarboard2$": "Liferaft/Rescue Boat Davit S2",
-
-
-        # Lifeboat/Rescue Boat Davit S1
-    r"^Lifeboat/Rescue Boat DavitS1$": "Lifeboat/Rescue Boat Davit S1",
-    r"^Lifeboat/Rescue Boat DavitStarboard1$": "Lifeboat/Rescue Boat Davit S1",
-
-    # Liferaft Embarkation Ladder P3/S3
-    r"^Liferaft Embarkation LadderP3$": "Liferaft Embarkation Ladder P3",
-    r"^Liferaft Embarkation LadderPort3$": "Liferaft Embarkation Ladder P3",
-    r"^Liferaft Embarkation LadderS3$": "Liferaft Embarkation Ladder S3",
-    r"^Liferaft Embarkation LadderStarboard3$": "Liferaft Embarkation Ladder S3",
-
-
-        # Liferaft 6 Person F1
-    r"^Liferaft 6 PersonF1$": "Liferaft 6 Person F1",
-    r"^Liferaft 6 PersonForward1$": "Liferaft 6 Person F1",
-
-    # Mooring Winch Aft combinations
-    r"^Mooring WinchA-P1$": "Mooring Winch A-P1",
-    r"^Mooring WinchA-P2$": "Mooring Winch A-P2",
-    r"^Mooring WinchA-S1$": "Mooring Winch A-S1",
-    r"^Mooring WinchA-S2$": "Mooring Winch A-S2",
-    r"^Mooring WinchAft-Port1$": "Mooring Winch A-P1",
-    r"^Mooring WinchAft-Port2$": "Mooring Winch A-P2",
-    r"^Mooring WinchAft-Stbd1$": "Mooring Winch A-S1",
-    r"^Mooring WinchAft-Stbd2$": "Mooring Winch A-S2",
-
-    # Mooring Winch Forward combinations
-    r"^Mooring WinchF-P1$": "Mooring Winch F-P1",
-    r"^Mooring WinchF-S1$": "Mooring Winch F-S1",
-    r"^Mooring WinchFwd-Port1$": "Mooring Winch F-P1",
-    r"^Mooring WinchFwd-Stbd1$": "Mooring Winch F-S1",
-
-        # Liferaft FP / FS
-    r"^LiferaftFP$": "Liferaft FP",
-    r"^LiferaftFS$": "Liferaft FS",
-    r"^LiferaftFwd-P$": "Liferaft FP",
-    r"^LiferaftFwdS$": "Liferaft FS",
-
-    # Combined Mooring Winch Hydraulic Unit
-    r"^Combined Mooring Winch Hydraulic UnitA1$": "Combined Mooring Winch Hydraulic Unit A1",
-    r"^Combined Mooring Winch Hydraulic UnitAft1$": "Combined Mooring Winch Hydraulic Unit A1",
-
-    # Emergency Towing System F2
-    r"^Emergency Towing SystemF2$": "Emergency Towing System F2",
-    r"^Emergency Towing SystemForward2$": "Emergency Towing System F2",
-
-    # Liferaft 20 Person
-    r"^Liferaft 20 PersonP1$": "Liferaft 20 Person P1",
-    r"^Liferaft 20 PersonP2$": "Liferaft 20 Person P2",
-    r"^Liferaft 20 PersonPort1$": "Liferaft 20 Person P1",
-    r"^Liferaft 20 PersonPort2$": "Liferaft 20 Person P2",
-    r"^Liferaft 20 PersonS1$": "Liferaft 20 Person S1",
-    r"^Liferaft 20 PersonS2$": "Liferaft 20 Person S2",
-    r"^Liferaft 20 PersonStarboard1$": "Liferaft 20 Person S1",
-    r"^Liferaft 20 PersonStarboard2$": "Liferaft 20 Person S2",
-
-    # Mooring Winch Hydraulic Unit Forward
-    r"^Mooring Winch Hydraulic UnitF1$": "Mooring Winch Hydraulic Unit F1",
-    r"^Mooring Winch Hydraulic UnitForward1$": "Mooring Winch Hydraulic Unit F1",
-
-    # Provision Crane Starboard
-    r"^Provision Crane StbdS1$": "Provision Crane S1",
-    r"^Provision Crane StbdStarboard1$": "Provision Crane S1",
-
-        # Liferaft FP / FS variants
-    r"^LiferaftFP$": "Liferaft FP",
-    r"^LiferaftFS$": "Liferaft FS",
-    r"^LiferaftFwd-P$": "Liferaft FP",
-    r"^LiferaftFwdS$": "Liferaft FS",
-
-        # Liferaft Embarkation Ladder FS
-    r"^Liferaft Embarkation LadderFS$": "Liferaft Embarkation Ladder FS",
-    r"^Liferaft Embarkation LadderFwdS$": "Liferaft Embarkation Ladder FS",
-
-    # Liferaft FP / FS
-    r"^LiferaftFP$": "Liferaft FP",
-    r"^LiferaftFS$": "Liferaft FS",
-    r"^LiferaftFwd-P$": "Liferaft FP",
-    r"^LiferaftFwdS$": "Liferaft FS",
-
-        # Combined Mooring Winch Hydraulic Unit F2
-    r"^Combined Mooring Winch Hydraulic UnitF2$": "Combined Mooring Winch Hydraulic Unit F2",
-    r"^Combined Mooring Winch Hydraulic UnitForward2$": "Combined Mooring Winch Hydraulic Unit F2",
-
-    # Mooring Winch Hydraulic Unit A2
-    r"^Mooring Winch Hydraulic UnitA2$": "Mooring Winch Hydraulic Unit A2",
-    r"^Mooring Winch Hydraulic UnitAft2$": "Mooring Winch Hydraulic Unit A2",
-
-        # Combined Windlass Mooring Winch FP / FS
-    r"^Combined Windlass Mooring WinchFP$": "Combined Windlass Mooring Winch FP",
-    r"^Combined Windlass Mooring WinchFS$": "Combined Windlass Mooring Winch FS",
-    r"^Combined Windlass Mooring WinchFwd-P$": "Combined Windlass Mooring Winch FP",
-    r"^Combined Windlass Mooring WinchFwdS$": "Combined Windlass Mooring Winch FS",
-
-    # Mooring Winch Aft/Side variants
-    r"^Mooring WinchA-P3$": "Mooring Winch A-P3",
-    r"^Mooring WinchA-S4$": "Mooring Winch A-S3",
-    r"^Mooring WinchAft-Port3$": "Mooring Winch A-P3",
-    r"^Mooring WinchAft-Stbd4$": "Mooring Winch A-S3",
-
-        # Liferaft 15 Person S1/S2
-    r"^Liferaft 15 PersonS1$": "Liferaft 15 Person S1",
-    r"^Liferaft 15 PersonS2$": "Liferaft 15 Person S2",
-    r"^Liferaft 15 PersonStarboard1$": "Liferaft 15 Person S1",
-    r"^Liferaft 15 PersonStarboard2$": "Liferaft 15 Person S2",
-
-        # Bilge Well
-    r"^Bilge WellC1$": "Bilge Well C1",
-    r"^Bilge WellCentre1$": "Bilge Well C1",
-    r"^Bilge WellP1$": "Bilge Well P1",
-    r"^Bilge WellPort1$": "Bilge Well P1",
-    r"^Bilge WellS1$": "Bilge Well S1",
-    r"^Bilge WellStarboard1$": "Bilge Well S1",
-
-    # Chain Locker
-    r"^Chain LockerC1$": "Chain Locker C1",
-    r"^Chain LockerC2$": "Chain Locker C2",
-    r"^Chain LockerCentre1$": "Chain Locker C1",
-    r"^Chain LockerCentre2$": "Chain Locker C2",
-
-    # Suez Search Light Davit
-    r"^Suez Search Light DavitF1$": "Suez Search Light Davit F1",
-    r"^Suez Search Light DavitForward1$": "Suez Search Light Davit F1",
-
-        # Liferaft 15 Person P1/P2
-    r"^Liferaft 15 PersonP1$": "Liferaft 15 Person P1",
-    r"^Liferaft 15 PersonP2$": "Liferaft 15 Person P2",
-    r"^Liferaft 15 PersonPort1$": "Liferaft 15 Person P1",
-    r"^Liferaft 15 PersonPort2$": "Liferaft 15 Person P2",
-
-    # Liferaft 6 Person C1
-    r"^Liferaft 6 PersonC1$": "Liferaft 6 Person C1",
-    r"^Liferaft 6 PersonCentre1$": "Liferaft 6 Person C1",
-
-    # Lifeboat Davit with dot notation
-    r"^Lifeboat Davit\.S1$": "Lifeboat Davit S",
-    r"^Lifeboat Davit\.Starboard1$": "Lifeboat Davit S",
-
-
-    
-    }
-    
-    
-    for pattern, replacement in specific_mapping.items():
-        if re.match(pattern, original_value, flags=re.IGNORECASE):
-            return replacement
-
-    # Priority 2: Generic suffix replacements for standard machinery types
-    suffix_mapping = {
-        r"(.*)(?:Aft)$": r"\1A",
-        r"(.*)(?:Forward)$": r"\1F",
-        r"(.*)(?:Fwd)$": r"\1F",
-        r"(.*)(?:Port)$": r"\1P",
-        r"(.*)(?:Starboard)$": r"\1S",
-        r"(.*)(?:-P)$": r"\1P",
-        r"(.*)(?:-S)$": r"\1S",
-        r"(.*)(?:-Port)$": r"\1P",
-        r"(.*)(?:-Stbd)$": r"\1S",
-    }
-
-    for pattern, replacement in suffix_mapping.items():
-        if re.match(pattern, original_value, flags=re.IGNORECASE):
-            return re.sub(pattern, replacement, original_value, flags=re.IGNORECASE).strip()
-
-    return original_value
-
-
-
-
-def count_titles(column):
-    if column == '-' or pd.isna(column):
-        return 0
-    return len([x for x in column.split(', ') if x.strip()])
-
-def add_count_columns(df):
-    df['Common Count'] = df['Common Titles'].apply(count_titles)
-    title_cols = [col for col in df.columns if 'Titles only in' in col]
-    if len(title_cols) >= 2:
-        df['Only in File 1 Count'] = df[title_cols[0]].apply(count_titles)
-        df['Only in File 2 Count'] = df[title_cols[1]].apply(count_titles)
-    else:
-        df['Only in File 1 Count'] = 0
-        df['Only in File 2 Count'] = 0
-    return df
-
-def prepare_excel_report(df, file1_name, file2_name, vessel1_name, vessel2_name):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Job Title Comparison"
+def _report_styles():
+    """Named styles shared by every cell of the title comparison report."""
+    fill_yellow = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")
+    fill_red = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+    fill_light_blue = PatternFill(start_color="DDEBF7", end_color="DDEBF7", fill_type="solid")
+    wrap_top = Alignment(wrap_text=True, vertical='top')
+
+    return [
+        NamedStyle(name="report_bold", font=Font(bold=True)),
+        NamedStyle(name="report_note", font=Font(italic=True)),
+        NamedStyle(name="report_stripe", fill=fill_light_blue),
+        NamedStyle(name="report_wrap", alignment=wrap_top),
+        NamedStyle(name="report_wrap_bold", font=Font(bold=True), alignment=wrap_top),
+        NamedStyle(name="report_wrap_changed", fill=fill_yellow, alignment=wrap_top),
+        NamedStyle(name="report_wrap_flag", font=Font(color="9C0006"), fill=fill_red, alignment=wrap_top),
+    ]
+
+
+def _styled_row(ws, values, styles):
+    row = []
+    for value, style in zip(values, styles):
+        cell = WriteOnlyCell(ws, value=value)
+        if style:
+            cell.style = style
+        row.append(cell)
+    return row
+
+
+def prepare_excel_report(comparison, file1_name, file2_name, vessel1_name, vessel2_name):
+    """Build the title comparison workbook in a single streaming pass.
+
+    The workbook is written in openpyxl's write-only mode: every row is
+    emitted once with its named styles already attached, so memory stays
+    flat and write time grows linearly with the number of machinery.
+    """
+    # Display strings are rendered here; the counts come precomputed with the comparison
+    df = comparison.to_display_frame()
+    title_counts = comparison.frame[COUNT_COLUMNS].values.tolist()
+
+    wb = Workbook(write_only=True)
+    for style in _report_styles():
+        wb.add_named_style(style)
+
+    ws = wb.create_sheet(title="Job Title Comparison")
 
     if not df.empty:
         headers = [
@@ -579,69 +92,43 @@ def prepare_excel_report(df, file1_name, file2_name, vessel1_name, vessel2_name)
             'Titles only in Job List', 'Titles only is Job Status',
             'Count for Common Titles', 'Count for Job List Titles', 'Count for Job Status Titles'
         ]
-        for col_idx, header in enumerate(headers, 1):
-            ws.cell(row=1, column=col_idx, value=header)
-
-        for row_idx, row_data in enumerate(df.values, 2):
-            row_vals = list(row_data)
-            row_vals += [count_titles(row_data[2]), count_titles(row_data[3]), count_titles(row_data[4])]
-            for col_idx, value in enumerate(row_vals, 1):
-                ws.cell(row=row_idx, column=col_idx, value=value)
-
-    fill_yellow = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")
-    fill_red = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-    fill_light_blue = PatternFill(start_color="DDEBF7", end_color="DDEBF7", fill_type="solid")
-    bold_font = Font(bold=True)
-    red_font = Font(color="9C0006")
-
-    if not df.empty:
-        for col in range(1, len(df.columns) + 4):
-            ws.cell(row=1, column=col).font = bold_font
-
-        for row in range(2, len(df) + 2):
-            has_diff = ws.cell(row=row, column=2).value
-            if has_diff == 'Yes':
-                ws.cell(row=row, column=1).font = bold_font
-                for col in range(1, len(df.columns) + 1):
-                    header = ws.cell(row=1, column=col).value
-                    if 'Titles only in' in header:
-                        cell = ws.cell(row=row, column=col)
-                        if cell.value != '-':
-                            cell.fill = fill_yellow
-                ws.cell(row=row, column=2).font = red_font
-                ws.cell(row=row, column=2).fill = fill_red
-
-        for col in range(1, len(df.columns) + 4):
-            col_letter = chr(64 + (col if col <= 26 else (col - 1)//26 + 64))
-            ws.column_dimensions[col_letter].width = 30
-            for row in range(2, len(df) + 2):
-                ws.cell(row=row, column=col).alignment = Alignment(wrap_text=True, vertical='top')
+        for col_idx in range(1, len(headers) + 1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = 30
+        ws.append(_styled_row(ws, headers, ["report_bold"] * len(headers)))
+
+        # Titles only in the Job List file are highlighted when they differ
+        changed_cols = [idx for idx, header in enumerate(headers[:len(df.columns)]) if 'Titles only in' in header]
+        for row_data, row_counts in zip(df.values, title_counts):
+            row_vals = list(row_data) + row_counts
+            styles = ["report_wrap"] * len(row_vals)
+            if row_vals[1] == 'Yes':
+                styles[0] = "report_wrap_bold"
+                styles[1] = "report_wrap_flag"
+                for idx in changed_cols:
+                    if row_vals[idx] != '-':
+                        styles[idx] = "report_wrap_changed"
+            ws.append(_styled_row(ws, row_vals, styles))
 
     machinery_diff_sheet = wb.create_sheet(title="Machinery Differences")
-    diff_machinery = df[df['Has Differences'] == 'Yes']['Machinery'].tolist() if not df.empty else []
-
-    machinery_diff_sheet.cell(row=1, column=1, value="Machinery with Different Job Titles")
-    machinery_diff_sheet.cell(row=1, column=2, value=f"Comparison: {vessel1_name} vs {vessel2_name}")
-    machinery_diff_sheet.cell(row=1, column=1).font = bold_font
-    machinery_diff_sheet.cell(row=1, column=2).font = bold_font
+    machinery_diff_sheet.column_dimensions['B'].width = 50
+    diff_machinery = comparison.machinery_with_differences()
 
-    machinery_diff_sheet.cell(row=3, column=1, value="No.")
-    machinery_diff_sheet.cell(row=3, column=2, value="Machinery")
-    machinery_diff_sheet.cell(row=3, column=1).font = bold_font
-    machinery_diff_sheet.cell(row=3, column=2).font = bold_font
+    machinery_diff_sheet.append(_styled_row(
+        machinery_diff_sheet,
+        ["Machinery with Different Job Titles", f"Comparison: {vessel1_name} vs {vessel2_name}"],
+        ["report_bold", "report_bold"]
+    ))
+    machinery_diff_sheet.append([])
+    machinery_diff_sheet.append(_styled_row(machinery_diff_sheet, ["No.", "Machinery"], ["report_bold", "report_bold"]))
 
     for idx, machinery in enumerate(sorted(diff_machinery), 1):
-        machinery_diff_sheet.cell(row=idx+3, column=1, value=idx)
-        machinery_diff_sheet.cell(row=idx+3, column=2, value=machinery)
-        if idx % 2 == 0:
-            machinery_diff_sheet.cell(row=idx+3, column=1).fill = fill_light_blue
-            machinery_diff_sheet.cell(row=idx+3, column=2).fill = fill_light_blue
-
-    machinery_diff_sheet.column_dimensions['B'].width = 50
+        stripe = "report_stripe" if idx % 2 == 0 else None
+        machinery_diff_sheet.append(_styled_row(machinery_diff_sheet, [idx, machinery], [stripe, stripe]))
 
     if not diff_machinery:
-        machinery_diff_sheet.cell(row=4, column=1, value="No machinery with different job titles found")
-        machinery_diff_sheet.cell(row=4, column=1).font = Font(italic=True)
+        machinery_diff_sheet.append(_styled_row(
+            machinery_diff_sheet, ["No machinery with different job titles found"], ["report_note"]
+        ))
 
     try:
         output_final = BytesIO()
@@ -659,15 +146,18 @@ def prepare_excel_report(df, file1_name, file2_name, vessel1_name, vessel2_name)
         return output_error.getvalue()
 
 def compare_titles(file1_content, file2_content, file1_name, file2_name):
-    """Compare job titles between two CSV files for each machinery."""
+    """Compare job titles between two CSV files for each machinery.
+
+    Returns a ``TitleComparison``, the list of machinery with different
+    titles and a ``LazyReport`` that builds the Excel report on demand
+    (None if the comparison failed).
+    """
     try:
-        # Read CSV files
-        df1 = pd.read_csv(BytesIO(file1_content))
-        df2 = pd.read_csv(BytesIO(file2_content))
-        
-        # Print column names for debugging
-        print("First file columns:", df1.columns.tolist())
-        print("Second file columns:", df2.columns.tolist())
+        # Parse the CSV files unless the caller already loaded them
+        export1 = as_job_export(file1_content, file1_name)
+        export2 = as_job_export(file2_content, file2_name)
+        df1 = export1.frame
+        df2 = export2.frame
         
         # Extract dates and vessel names
         date1_fmt = extract_date_from_filename(file1_name)
@@ -675,127 +165,40 @@ def compare_titles(file1_content, file2_content, file1_name, file2_name):
         vessel1 = get_vessel_name(df1)
         vessel2 = get_vessel_name(df2)
         
-        # Determine columns based on actual file structure
-        first_machinery_col = None
-        first_title_col = None
-        second_machinery_col = None
-        second_title_col = None
-        
-        # Check first file
-        if 'Machinery Location' in df1.columns:
-            first_machinery_col = 'Machinery Location'
-        elif 'Machinery' in df1.columns:
-            first_machinery_col = 'Machinery'
-        
-        if 'Title' in df1.columns:
-            first_title_col = 'Title'
-        elif 'Job Title' in df1.columns:
-            first_title_col = 'Job Title'
-        # Check for Job Title.1
-        elif 'Job Title.1' in df1.columns:
-            first_title_col = 'Job Title.1'
-        
-        # Check second file  
-        if 'Machinery Location' in df2.columns:
-            second_machinery_col = 'Machinery Location'
-        elif 'Machinery' in df2.columns:
-            second_machinery_col = 'Machinery'
-        
-        # Handle job title columns in the second file
-        if 'Job Title' in df2.columns:
-            # Prioritize Job Title column
-            second_title_col = 'Job Title'
-        elif 'Title' in df2.columns:
-            second_title_col = 'Title'
-        elif 'Job Title.1' in df2.columns:
-            second_title_col = 'Job Title.1'
-        
-        if first_machinery_col is None:
-            raise ValueError("Machinery column not found in first file. Available columns: " + 
-                            str(df1.columns.tolist()))
-        
-        if first_title_col is None:
-            raise ValueError("Title/Job Title column not found in first file. Available columns: " + 
-                            str(df1.columns.tolist()))
-        
-        if second_machinery_col is None:
-            raise ValueError("Machinery column not found in second file. Available columns: " + 
-                            str(df2.columns.tolist()))
+        with span('column detection'):
+            # Determine columns based on actual file structure
+            first_machinery_col = find_column(df1.columns, TITLE_MACHINERY_COLUMNS)
+            first_title_col = find_column(df1.columns, FIRST_FILE_TITLE_COLUMNS)
+            second_machinery_col = find_column(df2.columns, TITLE_MACHINERY_COLUMNS)
+            # The second file prioritizes the Job Title column
+            second_title_col = find_column(df2.columns, SECOND_FILE_TITLE_COLUMNS)
         
-        if second_title_col is None:
-            raise ValueError("Title/Job Title column not found in second file. Available columns: " + 
-                            str(df2.columns.tolist()))
+            if first_machinery_col is None:
+                raise ValueError("Machinery column not found in first file. Available columns: " + 
+                                str(df1.columns.tolist()))
         
-        print(f"Using columns: {first_machinery_col}, {first_title_col} from first file")
-        print(f"Using columns: {second_machinery_col}, {second_title_col} from second file")
+            if first_title_col is None:
+                raise ValueError("Title/Job Title column not found in first file. Available columns: " + 
+                                str(df1.columns.tolist()))
         
-        # Print the first few rows of data for debugging
-        print("\nFirst file sample data:")
-        for idx, row in df1.head(3).iterrows():
-            print(f"  Row {idx}: {first_machinery_col}={row[first_machinery_col]}, {first_title_col}={row[first_title_col]}")
-        
-        print("\nSecond file sample data:")
-        for idx, row in df2.head(3).iterrows():
-            print(f"  Row {idx}: {second_machinery_col}={row[second_machinery_col]}, {second_title_col}={row[second_title_col]}")
-        
-        # Standardize machinery names
-        df1[first_machinery_col] = df1[first_machinery_col].apply(lambda x: rename_machinery(str(x)) if pd.notna(x) else x)
-        df2[second_machinery_col] = df2[second_machinery_col].apply(lambda x: rename_machinery(str(x)) if pd.notna(x) else x)
+            if second_machinery_col is None:
+                raise ValueError("Machinery column not found in second file. Available columns: " + 
+                                str(df2.columns.tolist()))
         
+            if second_title_col is None:
+                raise ValueError("Title/Job Title column not found in second file. Available columns: " + 
+                                str(df2.columns.tolist()))
+
         # Format column names for display
         col1 = f"{vessel1} ({date1_fmt})"
         col2 = f"{vessel2} ({date2_fmt})"
         
-        # Prepare dataframes for title comparison
-        titles_df1 = df1[[first_machinery_col, first_title_col]].copy()
-        titles_df1.rename(columns={first_machinery_col: 'Machinery', first_title_col: 'Job Title'}, inplace=True)
-        titles_df1.drop_duplicates(inplace=True)
-        
-        titles_df2 = df2[[second_machinery_col, second_title_col]].copy()
-        titles_df2.rename(columns={second_machinery_col: 'Machinery', second_title_col: 'Job Title'}, inplace=True)
-        titles_df2.drop_duplicates(inplace=True)
-        
-        # Filter out any rows with missing machinery names
-        titles_df1 = titles_df1[titles_df1['Machinery'].notna()]
-        titles_df2 = titles_df2[titles_df2['Machinery'].notna()]
+        with span('title diff') as diff_span:
+            # Distinct (machinery, title) string pairs of each file, without missing
+            # machinery; memoized on the export for re-comparisons
+            titles_df1 = export1.title_pairs(first_machinery_col, first_title_col)
+            titles_df2 = export2.title_pairs(second_machinery_col, second_title_col)
         
-        # Convert all to strings for comparison
-        titles_df1['Machinery'] = titles_df1['Machinery'].astype(str)
-        titles_df1['Job Title'] = titles_df1['Job Title'].astype(str)
-        titles_df2['Machinery'] = titles_df2['Machinery'].astype(str)
-        titles_df2['Job Title'] = titles_df2['Job Title'].astype(str)
-        
-        # Create a dictionary to store title comparison results
-        title_comparison_results = []
-        
-        # Get unique machinery names from both DataFrames
-        all_machinery = pd.concat([
-            titles_df1['Machinery'], 
-            titles_df2['Machinery']
-        ]).drop_duplicates().tolist()
-        
-        # Compare titles for each machinery
-        for machinery in all_machinery:
-            if machinery == 'TOTAL':
-                continue
-                
-            # Get titles from both DataFrames
-            titles1 = titles_df1[titles_df1['Machinery'] == machinery]['Job Title'].tolist()
-            titles2 = titles_df2[titles_df2['Machinery'] == machinery]['Job Title'].tolist()
-            
-            # Remove "nan" values from comparison
-            titles1 = [t for t in titles1 if t != "nan"]
-            titles2 = [t for t in titles2 if t != "nan"]
-            
-            # Find unique titles in each dataframe
-            only_in_df1 = list(set(titles1) - set(titles2))
-            only_in_df2 = list(set(titles2) - set(titles1))
-            common_titles = list(set(titles1) & set(titles2))
-            
-            # Ensure unique column names by adding file names if vessel names are identical
-            first_file_name = os.path.splitext(os.path.basename(file1_name))[0]
-            second_file_name = os.path.splitext(os.path.basename(file2_name))[0]
-            
             # Create column names for title differences - ensuring uniqueness
             if vessel1 == vessel2:
                 first_title_col = f'Titles only in {vessel1} (File 1)'
@@ -803,83 +206,68 @@ def compare_titles(file1_content, file2_content, file1_name, file2_name):
             else:
                 first_title_col = f'Titles only in {vessel1}'
                 second_title_col = f'Titles only in {vessel2}'
-            
-            # Create result dictionary with consistent columns
-            # Fix the "Has Differences" flag logic - consider a difference if any titles exist in only one set
-            # This handles the case where a machinery has titles in only one file (titles1 or titles2 empty)
-            result_dict = {
-                'Machinery': machinery,
-                'Has Differences': 'Yes' if only_in_df1 or only_in_df2 else 'No',
-                'Common Titles': ', '.join(sorted(common_titles)) if common_titles else '-',
-                first_title_col: ', '.join(sorted(only_in_df1)) if only_in_df1 else '-',
-                second_title_col: ', '.join(sorted(only_in_df2)) if only_in_df2 else '-'
-            }
-            
-            # Include all machinery items with titles in at least one file
-            if titles1 or titles2:
-                title_comparison_results.append(result_dict)
-        
-        # Create DataFrame from results
-        title_comparison_df = pd.DataFrame(title_comparison_results)
+
+            # Get unique machinery names from both DataFrames
+            all_machinery = pd.concat([
+                titles_df1['Machinery'], 
+                titles_df2['Machinery']
+            ]).drop_duplicates().tolist()
+
+            # Tag every (machinery, title) pair with the file(s) it appears in using one
+            # outer merge, then gather each machinery's titles per tag in one groupby.
+            # "nan" titles are left out of the comparison.
+            title_pairs = pd.merge(
+                titles_df1[titles_df1['Job Title'] != 'nan'].drop_duplicates(),
+                titles_df2[titles_df2['Job Title'] != 'nan'].drop_duplicates(),
+                on=['Machinery', 'Job Title'],
+                how='outer',
+                indicator='Found In'
+            )
+            grouped_titles = title_pairs.groupby(['Machinery', 'Found In'], observed=True, sort=False)['Job Title']
+            titles_by_group = {key: tuple(sorted(titles)) for key, titles in grouped_titles.agg(list).items()}
+
+            title_records = []
+            for machinery in all_machinery:
+                if machinery == 'TOTAL':
+                    continue
+
+                common_titles = titles_by_group.get((machinery, 'both'), ())
+                only_in_df1 = titles_by_group.get((machinery, 'left_only'), ())
+                only_in_df2 = titles_by_group.get((machinery, 'right_only'), ())
+
+                # Include all machinery items with titles in at least one file
+                if not (common_titles or only_in_df1 or only_in_df2):
+                    continue
+
+                # A machinery has differences when any titles exist in only one set,
+                # including when it has titles in only one file
+                title_records.append((machinery, common_titles, only_in_df1, only_in_df2))
         
-        # Create column names for title differences - ensuring uniqueness
-        if vessel1 == vessel2:
-            first_title_col = f'Titles only in {vessel1} (File 1)'
-            second_title_col = f'Titles only in {vessel2} (File 2)'
-        else:
-            first_title_col = f'Titles only in {vessel1}'
-            second_title_col = f'Titles only in {vessel2}'
-            
-        # If we have no comparison results, create an empty dataframe with the expected columns
-        if title_comparison_df.empty:
-            title_comparison_df = pd.DataFrame(columns=[
-                'Machinery',
-                'Has Differences',
-                'Common Titles',
-                first_title_col, 
-                second_title_col
-            ])
-        else:
-            # Ensure columns are in the correct order if all exist in the dataframe
-            column_order = [
-                'Machinery',
-                'Has Differences',
-                'Common Titles'
-            ]
-            
-            # Add title columns that exist in the dataframe
-            for col in title_comparison_df.columns:
-                if 'Titles only in' in col and col not in column_order:
-                    column_order.append(col)
-            
-            # Reorder columns that exist
-            title_comparison_df = title_comparison_df[column_order]
-            
             # Sort by machinery name
-            title_comparison_df.sort_values('Machinery', inplace=True)
-        
+            title_comparison = TitleComparison.from_records(
+                title_records, first_title_col, second_title_col
+            ).sorted_by_machinery()
+            diff_span['rows'] = len(title_pairs)
+
         # Prepare list of machinery with differences
-        machinery_with_diff = title_comparison_df[title_comparison_df['Has Differences'] == 'Yes']['Machinery'].tolist()
+        machinery_with_diff = title_comparison.machinery_with_differences()
         
-        # Create Excel file
-        excel_data = prepare_excel_report(title_comparison_df, file1_name, file2_name, vessel1, vessel2)
+        # The Excel file is only built when it is downloaded
+        excel_data = LazyReport(
+            prepare_excel_report, title_comparison, file1_name, file2_name, vessel1, vessel2, name='title excel'
+        )
         
-        return title_comparison_df, machinery_with_diff, excel_data
-    except Exception as e:
-        # Log the error for debugging
-        print(f"Error in compare_titles: {str(e)}")
+        return title_comparison, machinery_with_diff, excel_data
+    except Exception:
+        logger.exception("Error in compare_titles")
         # Return empty results rather than raising an error
-        empty_df = pd.DataFrame(columns=[
-            'Machinery',
-            'Has Differences',
-            'Common Titles',
-            'Titles only in File 1',
-            'Titles only in File 2'
-        ])
-        return empty_df, [], BytesIO().getvalue()
+        return TitleComparison.empty_result(), [], None
 
 def render_title_comparison_app():
     """Render the Streamlit app for job title comparison."""
+    # Imported here so the comparison engine loads without Streamlit
+    import streamlit as st
+
     # Page config is now set in main.py
 
     st.title("🚢 Job Title Comparison Tool")
@@ -981,9 +369,10 @@ def render_title_comparison_app():
             
             try:
                 # Compare titles with robust error handling
-                title_diff_df, machinery_diff_list, excel_data = compare_titles(
+                title_comparison, machinery_diff_list, excel_data = compare_titles(
                     file1.getvalue(), file2.getvalue(), file1.name, file2.name
                 )
+                title_diff_df = title_comparison.to_display_frame()
                 
                 # Display summary statistics
                 st.subheader("📊 Comparison Summary")
@@ -1092,7 +481,7 @@ def render_title_comparison_app():
                     st.info("No job title comparison data generated. Please check if both files have matching machinery.")
                 
                 # Download section
-                if isinstance(excel_data, bytes) and len(excel_data) > 0:
+                if excel_data is not None:
                     st.subheader("📥 Download Report")
                     st.write("Download the detailed Excel report with highlighted job title differences:")
                     st.download_button(
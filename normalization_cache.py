@@ -0,0 +1,107 @@
+import os
+import sqlite3
+import threading
+
+DEFAULT_MAX_ENTRIES = 100_000
+
+# SQLite caps the number of bound parameters per statement
+_QUERY_CHUNK = 500
+
+
+class NormalizationCache:
+    """Persistent memo of raw machinery name -> normalized name.
+
+    Entries are keyed by the raw string plus the version hash of the rule
+    set that produced them. Opening the cache drops rows written under any
+    other version, so editing the rules invalidates it automatically. The
+    table is bounded to ``max_entries`` rows; the least recently used rows
+    are evicted first.
+    """
+
+    def __init__(self, path, version, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.version = version
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Streamlit reruns scripts on different threads; access is serialized by the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS machinery_names ("
+                " version TEXT NOT NULL,"
+                " raw TEXT NOT NULL,"
+                " normalized TEXT NOT NULL,"
+                " last_used INTEGER NOT NULL,"
+                " PRIMARY KEY (version, raw))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS machinery_names_last_used ON machinery_names (last_used)"
+            )
+            self._conn.execute("DELETE FROM machinery_names WHERE version != ?", (version,))
+            self._clock = self._conn.execute(
+                "SELECT COALESCE(MAX(last_used), 0) FROM machinery_names"
+            ).fetchone()[0]
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def get_many(self, raw_values):
+        """Return ``{raw: normalized}`` for the values already in the cache."""
+        found = {}
+        unique_values = list(dict.fromkeys(raw_values))
+        with self._lock, self._conn:
+            stamp = self._tick()
+            for start in range(0, len(unique_values), _QUERY_CHUNK):
+                chunk = unique_values[start:start + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT raw, normalized FROM machinery_names WHERE version = ? AND raw IN ({placeholders})",
+                    [self.version, *chunk],
+                ).fetchall()
+                found.update(rows)
+            if found:
+                self._conn.executemany(
+                    "UPDATE machinery_names SET last_used = ? WHERE version = ? AND raw = ?",
+                    [(stamp, self.version, raw) for raw in found],
+                )
+        return found
+
+    def put_many(self, normalized_by_raw):
+        """Store ``{raw: normalized}`` and evict least recently used rows over the bound."""
+        if not normalized_by_raw:
+            return
+        with self._lock, self._conn:
+            stamp = self._tick()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO machinery_names (version, raw, normalized, last_used) VALUES (?, ?, ?, ?)",
+                [(self.version, raw, normalized, stamp) for raw, normalized in normalized_by_raw.items()],
+            )
+            excess = self._conn.execute("SELECT COUNT(*) FROM machinery_names").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM machinery_names WHERE rowid IN ("
+                    " SELECT rowid FROM machinery_names ORDER BY last_used ASC LIMIT ?)",
+                    (excess,),
+                )
+
+    def get(self, raw_value):
+        return self.get_many([raw_value]).get(raw_value)
+
+    def put(self, raw_value, normalized):
+        self.put_many({raw_value: normalized})
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM machinery_names").fetchone()[0]
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM machinery_names")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
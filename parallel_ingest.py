@@ -0,0 +1,160 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ingestion import DEFAULT_CHUNK_ROWS, ExportAggregator, read_header, stream_job_export
+from instrumentation import span
+
+# Below this many bytes per worker, starting processes costs more than it saves
+MIN_PART_BYTES = 16 * 1024 * 1024
+_SCAN_BLOCK = 8 * 1024 * 1024
+_QUOTE = ord('"')
+_FIELD_EDGES = np.frombuffer(b',\r\n"', dtype=np.uint8)
+
+
+def _has_stray_quote(data):
+    """Whether ``data`` has a quote with field text on both sides.
+
+    Such a quote cannot open or close an RFC 4180 field (embedded quotes are
+    doubled), so counting quotes no longer tells whether a newline is inside
+    a field.
+    """
+    data = np.frombuffer(data, dtype=np.uint8)
+    quotes = np.flatnonzero(data[1:-1] == _QUOTE) + 1
+    if not len(quotes):
+        return False
+    at_edge = np.isin(data[quotes - 1], _FIELD_EDGES) | np.isin(data[quotes + 1], _FIELD_EDGES)
+    return not at_edge.all()
+
+
+def row_boundaries(path, parts, block_size=_SCAN_BLOCK):
+    """Byte offsets splitting a CSV file into about ``parts`` ranges of whole rows.
+
+    Returns ``[data_start, ..., file_size]``, where ``data_start`` is just
+    past the header row. A split is placed at the first newline after each
+    target offset that is outside quotes, tracked by counting quote
+    characters from the start of the file, so titles with quoted newlines
+    are never cut. Returns None when the file has a stray quote inside an
+    unquoted field, where that count cannot be trusted.
+    """
+    size = os.path.getsize(path)
+    targets = [0] + [size * part // parts for part in range(1, parts)]
+    offsets = []
+    quotes = 0
+    position = 0
+    previous = b''
+    with open(path, 'rb') as handle:
+        while targets:
+            block = handle.read(block_size)
+            if not block:
+                break
+            # The previous block's tail is included so quotes at the seam are checked too
+            if _has_stray_quote(previous[-2:] + block):
+                return None
+
+            while targets:
+                start = max(targets[0] - position, 0)
+                newline = block.find(b'\n', start)
+                while newline != -1 and (quotes + block.count(b'"', 0, newline)) % 2:
+                    newline = block.find(b'\n', newline + 1)
+                if newline == -1:
+                    break
+                targets.pop(0)
+                offset = position + newline + 1
+                if not offsets or offset > offsets[-1]:
+                    offsets.append(offset)
+
+            quotes += block.count(b'"')
+            position += len(block)
+            previous = block
+
+    if not offsets:
+        # A header without a trailing newline and no rows
+        return [size, size]
+    if offsets[-1] < size:
+        offsets.append(size)
+    return offsets
+
+
+class _RangeReader(io.RawIOBase):
+    """Read-only view of ``[start, end)`` of a file."""
+
+    def __init__(self, path, start, end):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        read = self._file.readinto(memoryview(buffer)[:size])
+        self._remaining -= read
+        return read
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def aggregate_range(path, header, start, end, chunksize=DEFAULT_CHUNK_ROWS):
+    """Parse the rows in ``[start, end)`` of a CSV file and pre-aggregate them.
+
+    Runs in a worker process; ``header`` is the file's column names, so
+    every range picks the same columns as ``compare_titles`` and
+    ``process_files`` would for the whole file.
+    """
+    aggregator = ExportAggregator(header)
+    with io.BufferedReader(_RangeReader(path, start, end)) as handle:
+        chunks = pd.read_csv(
+            handle, header=None, names=header, usecols=aggregator.usecols, dtype=aggregator.dtype,
+            chunksize=chunksize,
+        )
+        for chunk in chunks:
+            aggregator.add(chunk)
+    return aggregator
+
+
+def parallel_job_export(path, file_name=None, max_workers=None, chunksize=DEFAULT_CHUNK_ROWS):
+    """Read one large CSV export with several processes.
+
+    The file is split at row boundaries (see ``row_boundaries``), each range
+    is parsed and aggregated by ``aggregate_range`` in its own process and
+    the partial aggregates are merged in file order, so the result compares
+    exactly like ``stream_job_export`` of the same file. Small files, a
+    single worker and files whose quoting cannot be split safely are
+    streamed in this process instead.
+    """
+    file_name = file_name or os.path.basename(path)
+    max_workers = max_workers or os.cpu_count() or 1
+    parts = min(max_workers, os.path.getsize(path) // MIN_PART_BYTES)
+    if parts < 2:
+        return stream_job_export(path, file_name, chunksize=chunksize)
+
+    with span('row split'):
+        offsets = row_boundaries(path, parts)
+    if offsets is None or len(offsets) < 3:
+        return stream_job_export(path, file_name, chunksize=chunksize)
+
+    with open(path, 'rb') as handle:
+        header = read_header(handle)
+    ranges = list(zip(offsets[:-1], offsets[1:]))
+    with span('parallel read') as read_span:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(ranges))) as executor:
+            partials = list(executor.map(
+                aggregate_range,
+                [path] * len(ranges), [header] * len(ranges),
+                [start for start, _ in ranges], [end for _, end in ranges],
+                [chunksize] * len(ranges),
+            ))
+        aggregator = partials[0]
+        for partial in partials[1:]:
+            aggregator.merge(partial)
+        read_span['rows'] = aggregator.rows
+    return aggregator.to_export(file_name)
@@ -0,0 +1,80 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from machinery_normalizer import RULES_VERSION
+
+DEFAULT_MAX_RESULTS = 8
+
+
+def result_key(file1_content, file2_content, file1_name, file2_name, version=RULES_VERSION):
+    """Hash both uploads, their names and the rule-set version into one cache key.
+
+    File names are part of the key because the vessel names and dates in the
+    result columns are read from them.
+    """
+    digest = hashlib.sha256()
+    for part in (version, file1_name, file2_name):
+        digest.update(part.encode("utf-8") + b"\0")
+    for content in (file1_content, file2_content):
+        digest.update(len(content).to_bytes(8, "little"))
+        digest.update(content)
+    return digest.hexdigest()
+
+
+def export_key(content, file_name, version=RULES_VERSION):
+    """Cache key for one parsed upload, so each side can be cached on its own."""
+    digest = hashlib.sha256()
+    for part in (version, file_name):
+        digest.update(part.encode("utf-8") + b"\0")
+    digest.update(content)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Bounded in-memory LRU of comparison results keyed by ``result_key``.
+
+    Streamlit reruns the whole script on every widget interaction, so the
+    app looks results up here before parsing anything. Only the
+    ``max_entries`` most recently used results are kept. The same class
+    holds parsed uploads keyed by ``export_key``.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_RESULTS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached result for ``key``, computing and storing it on a miss."""
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
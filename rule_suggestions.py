@@ -0,0 +1,131 @@
+import argparse
+import csv
+import io
+import os
+import re
+from collections import Counter
+
+import pandas as pd
+
+from fuzzy_titles import TitleIndex
+from ingestion import machinery_columns, read_job_export_frame
+from machinery_normalizer import (
+    MACHINERY_RULES,
+    RULE_FIELDS,
+    clean_machinery_value,
+    default_normalizer,
+    read_rules,
+)
+
+DEFAULT_MIN_SCORE = 0.5
+DEFAULT_SUGGESTIONS = 3
+
+REPORT_COLUMNS = ['Machinery', 'Occurrences', 'Files', 'Suggested Name', 'Score', 'Other Suggestions', 'Rule']
+
+
+def canonical_names(rules=MACHINERY_RULES):
+    """Names the specific rules map to; these are the targets suggestions are drawn from."""
+    return sorted(set(rules['specific'].values()))
+
+
+def raw_machinery_counts(files):
+    """Count raw machinery names across ``[(file_name, bytes)]`` exports, before normalization.
+
+    Returns ``(occurrences, files_by_name)``: a Counter of cleaned names and
+    the set of file names each name appears in.
+    """
+    occurrences = Counter()
+    files_by_name = {}
+    for file_name, content in files:
+        frame = read_job_export_frame(content, file_name=file_name)
+        for column in machinery_columns(frame.columns):
+            for raw, count in frame[column].value_counts().items():
+                name = clean_machinery_value(raw)
+                occurrences[name] += int(count)
+                files_by_name.setdefault(name, set()).add(file_name)
+    return occurrences, files_by_name
+
+
+def _csv_row(fields):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerow(fields)
+    return buffer.getvalue()
+
+
+def rule_stub(name, target):
+    """A ``machinery_rules.csv`` row that would map ``name`` to ``target``.
+
+    Fields are CSV-quoted as needed, and the row is read back with
+    ``read_rules`` to make sure it loads as exactly this one rule.
+    """
+    pattern = f"^{re.escape(name)}$"
+    row = _csv_row(['specific', 'Suggested', pattern, target])
+    loaded = read_rules(io.StringIO(_csv_row(RULE_FIELDS) + row), 'rule stub')
+    if loaded['specific'] != {pattern: target}:
+        raise ValueError(f"Rule stub for {name!r} does not load back as one rule: {row!r}")
+    return row.rstrip('\n')
+
+
+def unmapped_machinery_report(files, normalizer=default_normalizer, targets=None,
+                              min_score=DEFAULT_MIN_SCORE, suggestions=DEFAULT_SUGGESTIONS):
+    """Machinery names no rule maps, with the closest existing rule targets.
+
+    A name is reported when neither a specific nor a suffix rule applies to
+    it and it is not already one of the rule targets. Targets are the
+    specific rule outputs plus what the rules produced for the names in
+    these files. Suggestions come from a trigram index over the targets (see
+    ``fuzzy_titles.TitleIndex``), so each lookup only scores targets sharing
+    trigrams with the name. Rows are ordered by how often the name occurs.
+    """
+    occurrences, files_by_name = raw_machinery_counts(files)
+    mapped = [name for name in occurrences if normalizer.matches_rule(name)]
+    if targets is None:
+        targets = sorted(set(canonical_names()) | set(normalizer.normalize_many(mapped)))
+    known = {target.lower() for target in targets}
+    index = TitleIndex(targets)
+    mapped = set(mapped)
+
+    rows = []
+    for name, count in occurrences.most_common():
+        if name in mapped or name.lower() in known or name.lower() == 'nan':
+            continue
+        candidates = sorted(index.candidates(name, min_score), key=lambda candidate: (-candidate[1], candidate[0]))
+        candidates = candidates[:suggestions]
+        best, score = candidates[0] if candidates else (None, None)
+        rows.append([
+            name,
+            count,
+            ', '.join(sorted(files_by_name[name])),
+            best,
+            round(score, 3) if score is not None else None,
+            ', '.join(target for target, _ in candidates[1:]),
+            rule_stub(name, best) if best else None,
+        ])
+    return pd.DataFrame(rows, columns=REPORT_COLUMNS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='List machinery names no rule maps and suggest rule targets.')
+    parser.add_argument('files', nargs='+', help='CSV exports to scan (.zip, .gz and .xz are read as they decompress)')
+    parser.add_argument('--output', help='write the report to this CSV file instead of printing it')
+    parser.add_argument('--min-score', type=float, default=DEFAULT_MIN_SCORE,
+                        help='lowest trigram similarity for a suggestion (default: 0.5)')
+    args = parser.parse_args(argv)
+
+    files = []
+    for path in args.files:
+        with open(path, 'rb') as csv_file:
+            files.append((os.path.basename(path), csv_file.read()))
+    report = unmapped_machinery_report(files, min_score=args.min_score)
+
+    if args.output:
+        report.to_csv(args.output, index=False)
+        print(f"{len(report)} unmapped machinery names -> {args.output}")
+    else:
+        with pd.option_context('display.max_rows', None, 'display.width', 200):
+            print(report.drop(columns=['Rule']).to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
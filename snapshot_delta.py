@@ -0,0 +1,238 @@
+import argparse
+import hashlib
+import json
+import os
+from io import BytesIO
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, NamedStyle
+
+from fleet_batch import export_date, export_vessel, is_job_list, read_export_files
+from ingestion import (
+    COUNT_MACHINERY_COLUMNS,
+    FIRST_FILE_TITLE_COLUMNS,
+    SECOND_FILE_TITLE_COLUMNS,
+    TITLE_MACHINERY_COLUMNS,
+    find_column,
+    load_job_export,
+)
+from machinery_normalizer import RULES_VERSION
+
+DELTA_COLUMNS = [
+    'Vessel',
+    'From Snapshot',
+    'To Snapshot',
+    'Machinery',
+    'Previous Count',
+    'Current Count',
+    'Count Change',
+    'Titles Added',
+    'Titles Removed',
+]
+
+
+class SnapshotAggregate:
+    """What one dated export says per machinery: its job count and its titles.
+
+    Only these aggregates are kept per snapshot (``counts`` maps machinery to
+    jobs, ``titles`` maps machinery to a frozenset of titles), so a long
+    history of exports can be diffed without keeping or re-reading the rows.
+    """
+
+    def __init__(self, vessel, snapshot_date, file_name, counts, titles):
+        self.vessel = vessel
+        self.snapshot_date = snapshot_date
+        self.file_name = file_name
+        self.counts = counts
+        self.titles = titles
+
+    @classmethod
+    def from_export(cls, export, vessel, snapshot_date, title_candidates=SECOND_FILE_TITLE_COLUMNS):
+        """Aggregate a loaded ``JobExport`` with the same column rules as the comparisons."""
+        counts = {}
+        count_column = find_column(export.columns, COUNT_MACHINERY_COLUMNS)
+        if count_column is not None:
+            counts = {machinery: int(jobs) for machinery, jobs in export.machinery_counts(count_column).items()}
+
+        titles = {}
+        machinery_column = find_column(export.columns, TITLE_MACHINERY_COLUMNS)
+        title_column = find_column(export.columns, title_candidates)
+        if machinery_column is not None and title_column is not None:
+            pairs = export.title_pairs(machinery_column, title_column)
+            pairs = pairs[pairs['Job Title'] != 'nan']
+            titles = {
+                machinery: frozenset(machinery_titles)
+                for machinery, machinery_titles in pairs.groupby('Machinery', sort=False)['Job Title']
+            }
+
+        return cls(vessel, snapshot_date, export.file_name, counts, titles)
+
+    @property
+    def label(self):
+        return self.snapshot_date.strftime('%d-%m-%Y') if self.snapshot_date else self.file_name
+
+    def to_dict(self):
+        """The vessel and aggregates as plain JSON data; the date and file name come from the file name."""
+        return {
+            'vessel': self.vessel,
+            'counts': self.counts,
+            'titles': {machinery: sorted(titles) for machinery, titles in self.titles.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data, snapshot_date, file_name):
+        titles = {machinery: frozenset(titles) for machinery, titles in data['titles'].items()}
+        return cls(data['vessel'], snapshot_date, file_name, data['counts'], titles)
+
+
+class AggregateCache:
+    """Directory of ``SnapshotAggregate``s as small JSON files, keyed by content hash.
+
+    A rerun over a growing history only reads and normalizes the exports it
+    has not seen; the rest are a hash and a JSON load. Each file also
+    records the rule-set version, and aggregates written under other rules
+    are treated as missing.
+    """
+
+    def __init__(self, root, version=RULES_VERSION):
+        self.root = root
+        self.version = version
+
+    def path(self, content_hash, kind):
+        return os.path.join(self.root, f"{content_hash}.{kind}.json")
+
+    def get(self, content_hash, kind, snapshot_date, file_name):
+        try:
+            with open(self.path(content_hash, kind), encoding='utf-8') as aggregate_file:
+                data = json.load(aggregate_file)
+        except FileNotFoundError:
+            return None
+        if data.get('rules_version') != self.version:
+            return None
+        return SnapshotAggregate.from_dict(data, snapshot_date, file_name)
+
+    def put(self, content_hash, kind, snapshot):
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(content_hash, kind)
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as aggregate_file:
+            json.dump(dict(snapshot.to_dict(), rules_version=self.version), aggregate_file)
+        os.replace(temporary_path, path)
+
+
+def snapshot_delta(previous, current):
+    """Per-machinery changes from ``previous`` to ``current``; unchanged machinery is left out.
+
+    Returns a DataFrame with ``DELTA_COLUMNS``. Titles are joined with
+    ``', '`` like the title comparison, ``'-'`` when there are none.
+    """
+    rows = []
+    machinery_names = sorted(set(previous.counts) | set(current.counts) | set(previous.titles) | set(current.titles))
+    for machinery in machinery_names:
+        previous_count = previous.counts.get(machinery, 0)
+        current_count = current.counts.get(machinery, 0)
+        previous_titles = previous.titles.get(machinery, frozenset())
+        current_titles = current.titles.get(machinery, frozenset())
+        added = sorted(current_titles - previous_titles)
+        removed = sorted(previous_titles - current_titles)
+        if previous_count == current_count and not added and not removed:
+            continue
+        rows.append([
+            current.vessel,
+            previous.label,
+            current.label,
+            machinery,
+            previous_count,
+            current_count,
+            current_count - previous_count,
+            ', '.join(added) or '-',
+            ', '.join(removed) or '-',
+        ])
+    return pd.DataFrame(rows, columns=DELTA_COLUMNS)
+
+
+def collect_snapshots(files, job_lists=False, cache=None):
+    """Aggregate every export of one kind, grouped by vessel and sorted by date.
+
+    Job Status exports are used by default; ``job_lists=True`` tracks the
+    Job List exports instead, with their title column picked the way
+    ``compare_titles`` picks it for a Job List. Returns
+    ``{vessel: [SnapshotAggregate, ...]}``. With an ``AggregateCache`` only
+    exports missing from it are parsed, and their aggregates are added.
+    """
+    title_candidates = FIRST_FILE_TITLE_COLUMNS if job_lists else SECOND_FILE_TITLE_COLUMNS
+    kind = 'job_list' if job_lists else 'job_status'
+    snapshots = {}
+    for file_name, content in files:
+        if is_job_list(file_name) != job_lists:
+            continue
+        snapshot_date = export_date(file_name)
+        content_hash = hashlib.sha256(content).hexdigest() if cache is not None else None
+        snapshot = cache.get(content_hash, kind, snapshot_date, file_name) if cache is not None else None
+        if snapshot is None:
+            vessel = export_vessel(file_name, content)
+            export = load_job_export(content, file_name)
+            snapshot = SnapshotAggregate.from_export(export, vessel, snapshot_date, title_candidates)
+            if cache is not None:
+                cache.put(content_hash, kind, snapshot)
+        snapshots.setdefault(snapshot.vessel, []).append(snapshot)
+    for vessel_snapshots in snapshots.values():
+        vessel_snapshots.sort(key=lambda snapshot: (snapshot.snapshot_date is None, snapshot.snapshot_date, snapshot.file_name))
+    return snapshots
+
+
+def consecutive_deltas(snapshots):
+    """Deltas between each pair of consecutive snapshots of every vessel, in one frame."""
+    deltas = [
+        snapshot_delta(previous, current)
+        for vessel in sorted(snapshots)
+        for previous, current in zip(snapshots[vessel], snapshots[vessel][1:])
+    ]
+    if not deltas:
+        return pd.DataFrame(columns=DELTA_COLUMNS)
+    return pd.concat(deltas, ignore_index=True)
+
+
+def prepare_delta_report(deltas):
+    """Write the consecutive snapshot changes to a single-sheet workbook."""
+    wb = Workbook(write_only=True)
+    wb.add_named_style(NamedStyle(name='delta_bold', font=Font(bold=True)))
+    sheet = wb.create_sheet('Snapshot Changes')
+
+    header = []
+    for column in DELTA_COLUMNS:
+        cell = WriteOnlyCell(sheet, value=column)
+        cell.style = 'delta_bold'
+        header.append(cell)
+    sheet.append(header)
+
+    for row in deltas.astype(object).values.tolist():
+        sheet.append(row)
+
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report what changed between consecutive exports of each vessel.')
+    parser.add_argument('source', help='directory or zip archive of dated CSV exports')
+    parser.add_argument('output', help='path of the Excel report to write')
+    parser.add_argument('--job-lists', action='store_true', help='track Job List exports instead of Job Status')
+    parser.add_argument('--cache', metavar='DIR',
+                        help='keep per-export aggregates here so later runs only read new exports')
+    args = parser.parse_args(argv)
+
+    cache = AggregateCache(args.cache) if args.cache else None
+    snapshots = collect_snapshots(read_export_files(args.source), job_lists=args.job_lists, cache=cache)
+    deltas = consecutive_deltas(snapshots)
+    with open(args.output, 'wb') as report_file:
+        report_file.write(prepare_delta_report(deltas))
+    print(f"{len(deltas)} machinery changes -> {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
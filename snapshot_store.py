@@ -0,0 +1,190 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from fleet_batch import export_date, export_vessel, is_job_list
+from ingestion import JobExport, load_job_export
+from machinery_normalizer import RULES_VERSION
+
+JOB_LIST = 'job_list'
+JOB_STATUS = 'job_status'
+_METADATA_KEY = b'job_export'
+_MANIFEST_NAME = 'manifest.json'
+_UNSAFE_PATH_RE = re.compile(r'[^\w.-]+')
+
+
+def export_kind(file_name):
+    return JOB_LIST if is_job_list(file_name) else JOB_STATUS
+
+
+class SnapshotStore:
+    """Parquet store of normalized job exports keyed by vessel, kind and snapshot date.
+
+    Each snapshot is the column-pruned ``JobExport.frame`` written after
+    machinery normalization, one file per
+    ``<root>/<vessel>/<job_list|job_status>/<YYYY-MM-DD>.parquet``. Machinery
+    and title columns stay dictionary encoded, so loading a snapshot skips
+    CSV parsing and ``rename_machinery`` entirely. The source file name, a
+    hash of its bytes and the rule-set version are kept in the Parquet
+    metadata; snapshots written under other rules are treated as missing.
+    ``manifest.json`` maps content hashes to snapshot paths, so re-ingesting
+    a known file is a hash and a Parquet read.
+    """
+
+    def __init__(self, root, version=RULES_VERSION):
+        self.root = root
+        self.version = version
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.root, _MANIFEST_NAME)
+
+    def manifest(self):
+        """``{content_hash: path relative to the root}`` of ingested files."""
+        try:
+            with open(self.manifest_path, encoding='utf-8') as manifest_file:
+                return json.load(manifest_file)
+        except FileNotFoundError:
+            return {}
+
+    def _record(self, content_hash, path):
+        manifest = self.manifest()
+        manifest[content_hash] = os.path.relpath(path, self.root)
+        temporary_path = self.manifest_path + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as manifest_file:
+            json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+        os.replace(temporary_path, self.manifest_path)
+
+    def lookup(self, content_hash):
+        """Metadata (with ``path``) of the current snapshot stored from this content, or None."""
+        relative_path = self.manifest().get(content_hash)
+        if relative_path is None:
+            return None
+        path = os.path.join(self.root, relative_path)
+        if not os.path.exists(path):
+            return None
+        metadata = self.metadata(path)
+        # The snapshot may since have been replaced by another file for the same date
+        if not metadata or metadata['content_hash'] != content_hash or metadata['rules_version'] != self.version:
+            return None
+        return dict(metadata, path=path)
+
+    def path(self, vessel, kind, snapshot_date):
+        vessel_dir = _UNSAFE_PATH_RE.sub('_', vessel).strip('_') or 'Unknown_Vessel'
+        return os.path.join(self.root, vessel_dir, kind, f"{snapshot_date:%Y-%m-%d}.parquet")
+
+    def put(self, export, vessel, kind, snapshot_date, content_hash=None):
+        """Write a loaded export; replaces any snapshot already stored under the same key."""
+        path = self.path(vessel, kind, snapshot_date)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        table = pa.Table.from_pandas(export.frame, preserve_index=False)
+        metadata = {
+            'vessel': vessel,
+            'kind': kind,
+            'snapshot_date': f"{snapshot_date:%Y-%m-%d}",
+            'file_name': export.file_name,
+            'content_hash': content_hash,
+            'rules_version': self.version,
+        }
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            _METADATA_KEY: json.dumps(metadata).encode('utf-8'),
+        })
+        # Write next to the target and swap, so readers never see half a file
+        temporary_path = path + '.tmp'
+        pq.write_table(table, temporary_path, compression='zstd')
+        os.replace(temporary_path, path)
+        if content_hash is not None:
+            self._record(content_hash, path)
+        return path
+
+    def metadata(self, path):
+        schema_metadata = pq.read_schema(path).metadata or {}
+        if _METADATA_KEY not in schema_metadata:
+            return None
+        return json.loads(schema_metadata[_METADATA_KEY])
+
+    def read(self, path):
+        """Load a stored snapshot as a ``JobExport``, or None if it is missing or stale."""
+        if not os.path.exists(path):
+            return None
+        metadata = self.metadata(path)
+        if metadata is None or metadata['rules_version'] != self.version:
+            return None
+        return JobExport(pq.read_table(path).to_pandas(), metadata['file_name'])
+
+    def get(self, vessel, kind, snapshot_date):
+        return self.read(self.path(vessel, kind, snapshot_date))
+
+    def ingest(self, content, file_name):
+        """Return the stored export for these CSV bytes, parsing and storing them only if needed.
+
+        Known content is found through the manifest before any CSV parsing.
+        """
+        snapshot_date = export_date(file_name)
+        if snapshot_date is None:
+            raise ValueError(f"No DDMMYYYY snapshot date at the end of file name {file_name!r}")
+        kind = export_kind(file_name)
+        content_hash = hashlib.sha256(content).hexdigest()
+        snapshot = self.lookup(content_hash)
+        if snapshot is not None:
+            export = JobExport(pq.read_table(snapshot['path']).to_pandas(), file_name)
+            if (snapshot['kind'], snapshot['snapshot_date']) != (kind, f"{snapshot_date:%Y-%m-%d}"):
+                # The same content sent again under another date
+                self.put(export, snapshot['vessel'], kind, snapshot_date, content_hash)
+            return export
+
+        vessel = export_vessel(file_name, content)
+        export = load_job_export(content, file_name)
+        self.put(export, vessel, kind, snapshot_date, content_hash)
+        return export
+
+    def snapshots(self, vessel=None, kind=None):
+        """Metadata of every current snapshot, optionally for one vessel and/or kind, oldest first."""
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+        for directory, _, file_names in os.walk(self.root):
+            for file_name in file_names:
+                if not file_name.endswith('.parquet'):
+                    continue
+                path = os.path.join(directory, file_name)
+                metadata = self.metadata(path)
+                if metadata is None or metadata['rules_version'] != self.version:
+                    continue
+                if vessel is not None and metadata['vessel'] != vessel:
+                    continue
+                if kind is not None and metadata['kind'] != kind:
+                    continue
+                found.append(dict(metadata, path=path))
+        return sorted(found, key=lambda snapshot: (snapshot['vessel'], snapshot['kind'], snapshot['snapshot_date']))
+
+    def latest(self, vessel, kind):
+        """Most recent stored export of a vessel, or None."""
+        snapshots = self.snapshots(vessel, kind)
+        return self.read(snapshots[-1]['path']) if snapshots else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Store normalized job exports as Parquet snapshots.')
+    parser.add_argument('root', help='snapshot store directory')
+    parser.add_argument('files', nargs='*', help='CSV exports to ingest; lists the store when omitted')
+    args = parser.parse_args(argv)
+
+    store = SnapshotStore(args.root)
+    for file_path in args.files:
+        with open(file_path, 'rb') as csv_file:
+            store.ingest(csv_file.read(), os.path.basename(file_path))
+    for snapshot in store.snapshots():
+        print(f"{snapshot['vessel']}\t{snapshot['kind']}\t{snapshot['snapshot_date']}\t{snapshot['file_name']}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+PAGE_SIZES = [50, 100, 250, 500]
+
+COMMON_TITLES_STYLE = 'background-color: #E8F5E9'  # green
+ONE_SIDED_TITLES_STYLE = 'background-color: #FFF3E0'  # orange
+MISSING_MACHINERY_STYLE = 'background-color: #FFC7CE; font-weight: bold'
+CHANGED_COUNT_STYLE = 'background-color: #FFEB9C'
+MORE_IN_FIRST_STYLE = 'background-color: #C6EFCE; color: #006100'
+MORE_IN_SECOND_STYLE = 'background-color: #FFC7CE; color: #9C0006'
+TOTAL_STYLE = 'font-weight: bold'
+
+
+def page_count(rows, page_size):
+    return max(1, math.ceil(rows / page_size))
+
+
+def page_bounds(page, page_size, rows):
+    """``(start, stop)`` row positions of a 1-based page, clamped to the table."""
+    page = min(max(page, 1), page_count(rows, page_size))
+    start = (page - 1) * page_size
+    return start, min(start + page_size, rows)
+
+
+def machinery_mask(machinery, text):
+    """Rows whose machinery name contains ``text``, case-insensitively."""
+    if not text:
+        return pd.Series(True, index=machinery.index)
+    return machinery.astype(str).str.contains(text, case=False, regex=False)
+
+
+def title_cell_styles(display):
+    """CSS for one page of the title comparison table, one mask per column.
+
+    Common titles are green and one-sided titles orange, unless the cell
+    is ``'-'``.
+    """
+    styles = pd.DataFrame('', index=display.index, columns=display.columns)
+    for column in display.columns:
+        if 'Titles only in' in column:
+            style = ONE_SIDED_TITLES_STYLE
+        elif 'Common Titles' in column:
+            style = COMMON_TITLES_STYLE
+        else:
+            continue
+        styles[column] = np.where(display[column] != '-', style, '')
+    return styles
+
+
+def count_cell_styles(counts):
+    """CSS for one page of the count comparison table, matching the Excel report.
+
+    ``counts`` has the Machinery, first file, second file and Difference
+    columns, in that order.
+    """
+    machinery, first, second, difference = counts.columns[:4]
+    total = (counts[machinery] == 'TOTAL').to_numpy()
+    first_counts = counts[first].to_numpy()
+    second_counts = counts[second].to_numpy()
+    missing = ((first_counts == 0) | (second_counts == 0)) & ~total
+    changed = (first_counts != second_counts) & ~total
+
+    styles = pd.DataFrame('', index=counts.index, columns=counts.columns)
+    styles[machinery] = np.where(missing, MISSING_MACHINERY_STYLE, '')
+    styles[first] = np.where(changed, CHANGED_COUNT_STYLE, '')
+    styles[second] = styles[first]
+    styles[difference] = np.select(
+        [changed & (first_counts > second_counts), changed | missing],
+        [MORE_IN_FIRST_STYLE, MORE_IN_SECOND_STYLE],
+        '',
+    )
+    styles.loc[total, :] = TOTAL_STYLE
+    return styles
@@ -1,10 +1,11 @@
 import pandas as pd
-import streamlit as st
 from io import BytesIO
 import re
 import os
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font, Alignment
+from instrumentation import span
+from machinery_normalizer import MACHINERY_RULES
 
 def extract_date_from_filename(filename):
     """Extract and format date from filename."""
@@ -26,32 +27,26 @@ def get_vessel_name(df):
             return vessel_values.iloc[0]
     return "Unknown Vessel"
 
+# The legacy rules live in the shared registry under the "legacy" stage
+_legacy_rename_rules = [
+    (re.compile(pattern), replacement) for pattern, replacement in MACHINERY_RULES["legacy"].items()
+]
+
 def rename_machinery(value):
     """Apply renaming rules to machinery values."""
-    rename_mapping = {
-        r"P1$": " P", r"Port1$": " P", r"S1$": " S", r"Starboard1$": " S", 
-        r"S2$": " S", r"Starboard2$": " S", r"F$": " F", r"Forward$": " F", 
-        r"A$": " A", r"Aft$": " A", r"P$": " P", r"Port$": " P", r"S$": " S", 
-        r"Starboard$": " S", r"Lifeboat DavitA$": " Lifeboat Davit A",
-        r"Lifeboat DavitAft$": " Lifeboat Davit A", r"LifeboatA$": " Lifeboat A",
-        r"LifeboatAft$": " Lifeboat A"
-    }
-    
     original_value = str(value).strip()
-    for pattern, replacement in rename_mapping.items():
-        if re.search(pattern, original_value):
-            return re.sub(pattern, replacement, original_value)
+    for pattern, replacement in _legacy_rename_rules:
+        if pattern.search(original_value):
+            return pattern.sub(replacement, original_value)
     return original_value
 
 def compare_titles(file1_content, file2_content, file1_name, file2_name):
     """Compare job titles between two CSV files for each machinery."""
     # Read CSV files
-    df_system_mgmt = pd.read_csv(BytesIO(file1_content))
-    df_pms_jobs = pd.read_csv(BytesIO(file2_content))
-    
-    # Print column names for debugging
-    print("First file columns:", df_system_mgmt.columns.tolist())
-    print("Second file columns:", df_pms_jobs.columns.tolist())
+    with span('read') as read_span:
+        df_system_mgmt = pd.read_csv(BytesIO(file1_content))
+        df_pms_jobs = pd.read_csv(BytesIO(file2_content))
+        read_span['rows'] = len(df_system_mgmt) + len(df_pms_jobs)
     
     # Extract dates and vessel names
     date1_fmt = extract_date_from_filename(file1_name)
@@ -59,87 +54,72 @@ def compare_titles(file1_content, file2_content, file1_name, file2_name):
     vessel1 = get_vessel_name(df_system_mgmt)
     vessel2 = get_vessel_name(df_pms_jobs)
     
-    # Print available columns for debugging
-    print("First file columns:", df_system_mgmt.columns.tolist())
-    print("Second file columns:", df_pms_jobs.columns.tolist())
-    
     # Based on the sample files:
     # First file (Federal Thunderbay 25032025.csv) has columns 'Machinery Location' and 'Title'
     # Second file (Federal Thunderbay Job List 24032025.csv) has columns 'Machinery' and 'Job Title'
     
-    # Determine columns based on actual file structure
-    first_machinery_col = None
-    first_title_col = None
-    second_machinery_col = None
-    second_title_col = None
-    
-    # Check first file
-    if 'Machinery Location' in df_system_mgmt.columns:
-        first_machinery_col = 'Machinery Location'
-    elif 'Machinery' in df_system_mgmt.columns:
-        first_machinery_col = 'Machinery'
-    
-    if 'Title' in df_system_mgmt.columns:
-        first_title_col = 'Title'
-    elif 'Job Title' in df_system_mgmt.columns:
-        first_title_col = 'Job Title'
-    
-    # Check second file  
-    if 'Machinery Location' in df_pms_jobs.columns:
-        second_machinery_col = 'Machinery Location'
-    elif 'Machinery' in df_pms_jobs.columns:
-        second_machinery_col = 'Machinery'
-    
-    # Handle duplicate columns by checking if 'Job Title' appears multiple times
-    col_counts = df_pms_jobs.columns.value_counts()
-    
-    if 'Title' in df_pms_jobs.columns:
-        second_title_col = 'Title'
-    elif 'Job Title' in df_pms_jobs.columns:
-        second_title_col = 'Job Title'
-        # Deal with duplicate 'Job Title' columns - use the last one by default
-        if col_counts.get('Job Title', 0) > 1:
-            print("Found duplicate 'Job Title' columns in second file")
-            # Find all columns that match 'Job Title'
-            job_title_cols = [col for col in df_pms_jobs.columns if col == 'Job Title']
-            # Use the last one
-            second_title_col = job_title_cols[-1]
-        # Some files may have duplicate Job Title columns with suffixes
-        if 'Job Title.1' in df_pms_jobs.columns:
-            # Use the last Job Title column (sometimes the last one is the correct one)
-            second_title_col = 'Job Title.1'
-    
-    if first_machinery_col is None:
-        raise ValueError("Machinery column not found in first file. Available columns: " + 
-                        str(df_system_mgmt.columns.tolist()))
-    
-    if first_title_col is None:
-        raise ValueError("Title/Job Title column not found in first file. Available columns: " + 
-                        str(df_system_mgmt.columns.tolist()))
-    
-    if second_machinery_col is None:
-        raise ValueError("Machinery column not found in second file. Available columns: " + 
-                        str(df_pms_jobs.columns.tolist()))
-    
-    if second_title_col is None:
-        raise ValueError("Title/Job Title column not found in second file. Available columns: " + 
-                        str(df_pms_jobs.columns.tolist()))
-    
-    print(f"Using columns: {first_machinery_col}, {first_title_col} from first file")
-    print(f"Using columns: {second_machinery_col}, {second_title_col} from second file")
-    
-    # Print the first few rows of data for debugging
-    print("\nFirst file sample data:")
-    for idx, row in df_system_mgmt.head(3).iterrows():
-        print(f"  Row {idx}: {first_machinery_col}={row[first_machinery_col]}, {first_title_col}={row[first_title_col]}")
-    
-    print("\nSecond file sample data:")
-    for idx, row in df_pms_jobs.head(3).iterrows():
-        print(f"  Row {idx}: {second_machinery_col}={row[second_machinery_col]}, {second_title_col}={row[second_title_col]}")
+    with span('column detection'):
+        # Determine columns based on actual file structure
+        first_machinery_col = None
+        first_title_col = None
+        second_machinery_col = None
+        second_title_col = None
+    
+        # Check first file
+        if 'Machinery Location' in df_system_mgmt.columns:
+            first_machinery_col = 'Machinery Location'
+        elif 'Machinery' in df_system_mgmt.columns:
+            first_machinery_col = 'Machinery'
+    
+        if 'Title' in df_system_mgmt.columns:
+            first_title_col = 'Title'
+        elif 'Job Title' in df_system_mgmt.columns:
+            first_title_col = 'Job Title'
+    
+        # Check second file  
+        if 'Machinery Location' in df_pms_jobs.columns:
+            second_machinery_col = 'Machinery Location'
+        elif 'Machinery' in df_pms_jobs.columns:
+            second_machinery_col = 'Machinery'
+    
+        # Handle duplicate columns by checking if 'Job Title' appears multiple times
+        col_counts = df_pms_jobs.columns.value_counts()
+    
+        if 'Title' in df_pms_jobs.columns:
+            second_title_col = 'Title'
+        elif 'Job Title' in df_pms_jobs.columns:
+            second_title_col = 'Job Title'
+            # Deal with duplicate 'Job Title' columns - use the last one by default
+            if col_counts.get('Job Title', 0) > 1:
+                # Find all columns that match 'Job Title'
+                job_title_cols = [col for col in df_pms_jobs.columns if col == 'Job Title']
+                # Use the last one
+                second_title_col = job_title_cols[-1]
+            # Some files may have duplicate Job Title columns with suffixes
+            if 'Job Title.1' in df_pms_jobs.columns:
+                # Use the last Job Title column (sometimes the last one is the correct one)
+                second_title_col = 'Job Title.1'
+    
+        if first_machinery_col is None:
+            raise ValueError("Machinery column not found in first file. Available columns: " + 
+                            str(df_system_mgmt.columns.tolist()))
+    
+        if first_title_col is None:
+            raise ValueError("Title/Job Title column not found in first file. Available columns: " + 
+                            str(df_system_mgmt.columns.tolist()))
+    
+        if second_machinery_col is None:
+            raise ValueError("Machinery column not found in second file. Available columns: " + 
+                            str(df_pms_jobs.columns.tolist()))
+    
+        if second_title_col is None:
+            raise ValueError("Title/Job Title column not found in second file. Available columns: " + 
+                            str(df_pms_jobs.columns.tolist()))
     
     # Standardize machinery names
-    df_system_mgmt[first_machinery_col] = df_system_mgmt[first_machinery_col].apply(lambda x: rename_machinery(str(x)) if pd.notna(x) else x)
-    df_pms_jobs[second_machinery_col] = df_pms_jobs[second_machinery_col].apply(lambda x: rename_machinery(str(x)) if pd.notna(x) else x)
+    with span('normalization', rows=len(df_system_mgmt) + len(df_pms_jobs)):
+        df_system_mgmt[first_machinery_col] = df_system_mgmt[first_machinery_col].apply(lambda x: rename_machinery(str(x)) if pd.notna(x) else x)
+        df_pms_jobs[second_machinery_col] = df_pms_jobs[second_machinery_col].apply(lambda x: rename_machinery(str(x)) if pd.notna(x) else x)
     
     # Format column names for display
     col1 = f"{vessel1} ({date1_fmt})"
@@ -298,6 +278,9 @@ def compare_titles(file1_content, file2_content, file1_name, file2_name):
 
 def render_title_comparison_app():
     """Render the Streamlit app for job title comparison."""
+    # Imported here so the comparison engine loads without Streamlit
+    import streamlit as st
+
     # Page config is now set in main.py
 
     st.title("🚢 Job Title Comparison Tool")
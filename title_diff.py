@@ -0,0 +1,106 @@
+import pandas as pd
+
+from fuzzy_titles import DEFAULT_SIMILARITY, match_titles
+
+COUNT_COLUMNS = ['Common Count', 'Only in File 1 Count', 'Only in File 2 Count']
+_TITLE_FIELDS = ['Common Titles', 'Only in File 1', 'Only in File 2']
+
+
+def render_titles(titles):
+    """Join a title list for display, '-' when there are none."""
+    return ', '.join(titles) if titles else '-'
+
+
+class TitleComparison:
+    """Per-machinery job title differences between two files.
+
+    Titles are kept as sorted tuples with their counts precomputed, in one
+    columnar frame indexed like the original comparison table. Display
+    strings are only built by ``to_display_frame``, at the UI/Excel edge,
+    so titles containing commas are never re-split or miscounted.
+
+    ``first_column``/``second_column`` are the display labels of the
+    one-sided title columns, e.g. ``'Titles only in <vessel>'``.
+    """
+
+    def __init__(self, frame, first_column, second_column):
+        self.frame = frame
+        self.first_column = first_column
+        self.second_column = second_column
+
+    @classmethod
+    def from_records(cls, records, first_column, second_column):
+        """Build from ``(machinery, common, only_in_1, only_in_2)`` tuples of sorted titles."""
+        frame = pd.DataFrame.from_records(records, columns=['Machinery'] + _TITLE_FIELDS)
+        for field, count_column in zip(_TITLE_FIELDS, COUNT_COLUMNS):
+            frame[count_column] = frame[field].map(len).astype(int)
+        frame['Has Differences'] = (frame['Only in File 1 Count'] > 0) | (frame['Only in File 2 Count'] > 0)
+        return cls(frame, first_column, second_column)
+
+    @classmethod
+    def empty_result(cls, first_column='Titles only in File 1', second_column='Titles only in File 2'):
+        return cls.from_records([], first_column, second_column)
+
+    @property
+    def columns(self):
+        """Column labels of the display table."""
+        return ['Machinery', 'Has Differences', 'Common Titles', self.first_column, self.second_column]
+
+    @property
+    def empty(self):
+        return self.frame.empty
+
+    def __len__(self):
+        return len(self.frame)
+
+    def sorted_by_machinery(self):
+        return TitleComparison(self.frame.sort_values('Machinery'), self.first_column, self.second_column)
+
+    def differences(self):
+        """Only the machinery whose titles differ between the files."""
+        return TitleComparison(self.frame[self.frame['Has Differences']], self.first_column, self.second_column)
+
+    def where(self, mask):
+        """Only the machinery selected by a boolean mask over ``frame``."""
+        return TitleComparison(self.frame[mask], self.first_column, self.second_column)
+
+    def rows(self, start, stop):
+        """Positional slice, e.g. one page of the display table."""
+        return TitleComparison(self.frame.iloc[start:stop], self.first_column, self.second_column)
+
+    def machinery_with_differences(self):
+        return self.frame.loc[self.frame['Has Differences'], 'Machinery'].tolist()
+
+    def probable_matches(self, threshold=DEFAULT_SIMILARITY):
+        """One-sided titles that are probably the same job spelled differently.
+
+        Within each machinery, titles only in file 1 are paired with titles
+        only in file 2 whose n-gram similarity reaches ``threshold`` (see
+        ``fuzzy_titles``). Returns one row per pair with its similarity.
+        """
+        both_sides = self.frame[(self.frame['Only in File 1 Count'] > 0) & (self.frame['Only in File 2 Count'] > 0)]
+        rows = [
+            (machinery, first_title, second_title, round(score, 3))
+            for machinery, only_in_1, only_in_2 in both_sides[
+                ['Machinery', 'Only in File 1', 'Only in File 2']
+            ].itertuples(index=False, name=None)
+            for first_title, second_title, score in match_titles(only_in_1, only_in_2, threshold)
+        ]
+        return pd.DataFrame(rows, columns=['Machinery', self.first_column, self.second_column, 'Similarity'])
+
+    def counts(self):
+        """Machinery with its common/only-in-1/only-in-2 title counts."""
+        return self.frame[['Machinery'] + COUNT_COLUMNS]
+
+    def to_display_frame(self, first_column=None, second_column=None):
+        """Render the comma-joined comparison table shown in the app.
+
+        The one-sided title columns can be relabeled for display.
+        """
+        display = pd.DataFrame(index=self.frame.index)
+        display['Machinery'] = self.frame['Machinery']
+        display['Has Differences'] = self.frame['Has Differences'].map({True: 'Yes', False: 'No'})
+        display['Common Titles'] = self.frame['Common Titles'].map(render_titles)
+        display[first_column or self.first_column] = self.frame['Only in File 1'].map(render_titles)
+        display[second_column or self.second_column] = self.frame['Only in File 2'].map(render_titles)
+        return display